@@ -0,0 +1,71 @@
+# Checks that FEN parsing and writing round-trip, then measures how many FENs per second
+# fen.py serializes and parses.
+# Run: python benchmark_fen.py [--count 100000]
+import argparse
+import random
+import time
+
+from fen import parse_fen, format_fen
+from movegen import generate_legal_moves
+from position import Position
+
+
+def sample_fens(count, seed=0):
+    # Positions from random games, so every kind of rank pattern shows up
+    rng = random.Random(seed)
+    fens = []
+    while len(fens) < count:
+        pos = Position()
+        for ply in range(rng.randint(1, 120)):
+            moves = generate_legal_moves(pos)
+            if not moves:
+                break
+            pos.push(rng.choice(moves))
+            fens.append(pos.fen())
+    return fens[:count]
+
+
+def check_round_trip(fens):
+    for fen in fens:
+        fields = parse_fen(fen)
+        if format_fen(*fields) != fen or Position(fen).fen() != fen:
+            raise AssertionError(f"FEN does not round-trip: {fen}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="FEN serializer benchmark")
+    parser.add_argument("--count", type=int, default=100000)
+    args = parser.parse_args()
+
+    fens = sample_fens(min(args.count, 5000))
+    check_round_trip(fens)
+    print(f"round trip: {len(fens)} positions ok")
+
+    fields = [parse_fen(fen) for fen in fens]
+    repeats = max(1, args.count // len(fens))
+
+    start = time.perf_counter()
+    for _ in range(repeats):
+        for field in fields:
+            format_fen(*field)
+    seconds = time.perf_counter() - start
+    print(f"format_fen: {int(repeats * len(fields) / seconds)} FEN/s")
+
+    start = time.perf_counter()
+    for _ in range(repeats):
+        for fen in fens:
+            parse_fen(fen)
+    seconds = time.perf_counter() - start
+    print(f"parse_fen:  {int(repeats * len(fens) / seconds)} FEN/s")
+
+    positions = [Position(fen) for fen in fens]
+    start = time.perf_counter()
+    for _ in range(repeats):
+        for pos in positions:
+            pos.fen()
+    seconds = time.perf_counter() - start
+    print(f"Position.fen: {int(repeats * len(positions) / seconds)} FEN/s")
+
+
+if __name__ == "__main__":
+    main()
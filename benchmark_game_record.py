@@ -0,0 +1,69 @@
+# Checks that game_record.py archives replay exactly, then compares their size with one FEN
+# string per ply and measures how fast GameArchive seeks to random plies.
+# Run: python benchmark_game_record.py [--games 200] [--seeks 10000]
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from game_record import GameArchive, append_game
+from movegen import generate_legal_moves
+from position import Position
+
+
+def random_game(rng, max_plies=300):
+    pos = Position()
+    moves = []
+    fens = [pos.fen()]
+    for ply in range(rng.randint(20, max_plies)):
+        legal = generate_legal_moves(pos)
+        if not legal:
+            break
+        move = rng.choice(legal)
+        pos.push(move)
+        moves.append(move)
+        fens.append(pos.fen())
+    return moves, fens
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Binary game archive benchmark")
+    parser.add_argument("--games", type=int, default=200)
+    parser.add_argument("--seeks", type=int, default=10000)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    games = [random_game(rng) for _ in range(args.games)]
+    fd, file_name = tempfile.mkstemp(suffix='.chgr')
+    os.close(fd)
+    try:
+        for moves, fens in games:
+            append_game(file_name, fens[0], moves)
+        binary_bytes = os.path.getsize(file_name)
+        fen_bytes = sum(len(fen) for moves, fens in games for fen in fens[1:])
+        plies = sum(len(moves) for moves, fens in games)
+        print(f"{args.games} games, {plies} plies")
+        print(f"FEN per ply: {fen_bytes} bytes, binary: {binary_bytes} bytes, "
+              f"{fen_bytes / binary_bytes:.1f}x smaller")
+
+        with GameArchive(file_name) as archive:
+            for index, (moves, fens) in enumerate(games):
+                game = archive[index]
+                if game.moves() != moves or [game.position_at(ply).fen() for ply in range(len(fens))] != fens:
+                    raise AssertionError(f"Game {index} does not replay")
+            print("replay: every ply of every game ok")
+
+            targets = [(rng.randrange(len(archive)), rng.random()) for _ in range(args.seeks)]
+            start = time.perf_counter()
+            for index, fraction in targets:
+                game = archive[index]
+                game.position_at(int(fraction * len(game)))
+            seconds = time.perf_counter() - start
+            print(f"seek: {seconds / args.seeks * 1e6:.0f} us per random ply")
+    finally:
+        os.remove(file_name)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+# Measures the parallel search: nodes per second and time to reach a fixed depth with 1, 2,
+# 4 and 8 worker processes, and the time-to-depth speedup over a single worker. With
+# --ordering it instead counts the nodes a single search needs with and without move ordering.
+# Run: python benchmark_search.py [--depth 4] [--workers 1 2 4 8] [--tt 64] [--ordering]
+import argparse
+
+from engine import Engine
+from engine_service import EngineService
+from position import Position
+
+BENCHMARK_FENS = [
+    "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1",
+    "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1",
+    "r1bq1rk1/pp2bppp/2n1pn2/3p4/2PP4/2N1PN2/PP3PPP/R2QKB1R w KQ - 0 8",
+    "8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1",
+]
+
+
+def run(workers, depth, tt_size_mb):
+    service = EngineService(tt_size_mb=tt_size_mb, workers=workers)
+    try:
+        service.select_best_move(BENCHMARK_FENS[0], max_depth=1)  # Start the worker processes
+        nodes = 0
+        seconds = 0.0
+        for fen in BENCHMARK_FENS:
+            service.clear()
+            uci, stats = service.select_best_move(fen, max_depth=depth)
+            nodes += stats["nodes"]
+            seconds += stats["time"]
+        return nodes, seconds
+    finally:
+        service.shutdown()
+
+
+def count_nodes(fen, depth, tt_size_mb, move_ordering):
+    engine = Engine(tt_size_mb=tt_size_mb, move_ordering=move_ordering)
+    engine.select_best_move(Position(fen), max_depth=depth)
+    return engine.nodes
+
+
+def compare_ordering(depth, tt_size_mb):
+    print(f"{'position':>8} {'unordered':>10} {'ordered':>10} {'saved':>6}")
+    totals = [0, 0]
+    for index, fen in enumerate(BENCHMARK_FENS):
+        unordered = count_nodes(fen, depth, tt_size_mb, False)
+        ordered = count_nodes(fen, depth, tt_size_mb, True)
+        totals[0] += unordered
+        totals[1] += ordered
+        print(f"{index + 1:>8} {unordered:>10} {ordered:>10} {100 - 100 * ordered // unordered:>5}%")
+    print(f"{'total':>8} {totals[0]:>10} {totals[1]:>10} {100 - 100 * totals[1] // totals[0]:>5}%")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Parallel search benchmark")
+    parser.add_argument("--depth", type=int, default=4)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--tt", type=int, default=64, help="transposition table size in MB")
+    parser.add_argument("--ordering", action="store_true", help="compare node counts with and without move ordering")
+    args = parser.parse_args()
+
+    if args.ordering:
+        compare_ordering(args.depth, args.tt)
+        return
+
+    print(f"{'workers':>7} {'nodes':>10} {'time (s)':>9} {'nps':>9} {'speedup':>8}")
+    baseline = None
+    for workers in args.workers:
+        nodes, seconds = run(workers, args.depth, args.tt)
+        baseline = baseline or seconds
+        print(f"{workers:>7} {nodes:>10} {seconds:>9.2f} {int(nodes / seconds):>9} {baseline / seconds:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
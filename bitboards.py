@@ -0,0 +1,161 @@
+# Bitboard constants and attack lookup tables, built once at import time.
+# Squares are numbered a1=0, b1=1, ..., h8=63 (file + 8 * rank).
+
+WHITE = 0
+BLACK = 1
+COLOR_NAMES = ['white', 'black']
+
+PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING = range(6)
+PIECE_SYMBOLS = 'pnbrqk'
+
+BB_ALL = 0xFFFF_FFFF_FFFF_FFFF
+BB_SQUARES = [1 << sq for sq in range(64)]
+
+BB_FILE_A = 0x0101_0101_0101_0101
+BB_FILE_H = BB_FILE_A << 7
+BB_RANK_1 = 0xFF
+BB_RANK_8 = BB_RANK_1 << 56
+BB_FILES = [BB_FILE_A << file for file in range(8)]
+BB_RANKS = [BB_RANK_1 << (8 * rank) for rank in range(8)]
+
+E1, E8 = 4, 60
+A1, H1, A8, H8 = 0, 7, 56, 63
+
+
+def square(file, rank):
+    return file + 8 * rank
+
+
+def square_file(sq):
+    return sq & 7
+
+
+def square_rank(sq):
+    return sq >> 3
+
+
+def square_name(sq):
+    return chr(square_file(sq) + 97) + str(square_rank(sq) + 1)
+
+
+def parse_square(name):
+    return square(ord(name[0]) - 97, int(name[1]) - 1)
+
+
+def iter_squares(bb):
+    # Yield the index of every set bit, lowest first
+    while bb:
+        lsb = bb & -bb
+        yield lsb.bit_length() - 1
+        bb ^= lsb
+
+
+def popcount(bb):
+    return bin(bb).count('1')
+
+
+def _between(a, b):
+    df = square_file(b) - square_file(a)
+    dr = square_rank(b) - square_rank(a)
+    if a == b or not (df == 0 or dr == 0 or abs(df) == abs(dr)):
+        return 0
+    step = (df > 0) - (df < 0) + 8 * ((dr > 0) - (dr < 0))
+    bb = 0
+    sq = a + step
+    while sq != b:
+        bb |= BB_SQUARES[sq]
+        sq += step
+    return bb
+
+
+# Squares strictly between two aligned squares, 0 when they are not on a common line
+BB_BETWEEN = [[_between(a, b) for b in range(64)] for a in range(64)]
+
+
+def _step_attacks(sq, deltas):
+    bb = 0
+    for df, dr in deltas:
+        file, rank = square_file(sq) + df, square_rank(sq) + dr
+        if 0 <= file < 8 and 0 <= rank < 8:
+            bb |= BB_SQUARES[square(file, rank)]
+    return bb
+
+
+KNIGHT_ATTACKS = [_step_attacks(sq, [(1, 2), (2, 1), (2, -1), (1, -2), (-1, -2), (-2, -1), (-2, 1), (-1, 2)])
+                  for sq in range(64)]
+KING_ATTACKS = [_step_attacks(sq, [(1, 0), (1, 1), (0, 1), (-1, 1), (-1, 0), (-1, -1), (0, -1), (1, -1)])
+                for sq in range(64)]
+# PAWN_ATTACKS[color][sq] -> squares a pawn of that colour on sq attacks
+PAWN_ATTACKS = [[_step_attacks(sq, [(-1, 1), (1, 1)]) for sq in range(64)],
+                [_step_attacks(sq, [(-1, -1), (1, -1)]) for sq in range(64)]]
+
+ROOK_DIRECTIONS = [(1, 0), (-1, 0), (0, 1), (0, -1)]
+BISHOP_DIRECTIONS = [(1, 1), (-1, 1), (1, -1), (-1, -1)]
+
+
+def _ray(sq, df, dr):
+    bb = 0
+    file, rank = square_file(sq) + df, square_rank(sq) + dr
+    while 0 <= file < 8 and 0 <= rank < 8:
+        bb |= BB_SQUARES[square(file, rank)]
+        file, rank = file + df, rank + dr
+    return bb
+
+
+_RAYS = {(df, dr): [_ray(sq, df, dr) for sq in range(64)] for df, dr in ROOK_DIRECTIONS + BISHOP_DIRECTIONS}
+
+
+def _sliding_attacks(sq, occupied, directions):
+    # Each ray stops at its first blocker; rays towards higher squares meet it at the lowest set bit
+    bb = 0
+    for direction in directions:
+        rays = _RAYS[direction]
+        ray = rays[sq]
+        blockers = ray & occupied
+        if blockers:
+            if 8 * direction[1] + direction[0] > 0:
+                ray ^= rays[(blockers & -blockers).bit_length() - 1]
+            else:
+                ray ^= rays[blockers.bit_length() - 1]
+        bb |= ray
+    return bb
+
+
+def _edges(sq):
+    return (((BB_RANK_1 | BB_RANK_8) & ~BB_RANKS[square_rank(sq)]) |
+            ((BB_FILE_A | BB_FILE_H) & ~BB_FILES[square_file(sq)]))
+
+
+def _attack_table(directions):
+    # PEXT-style lookup: the relevant occupancy bits of a square index straight into a table
+    # holding every blocker configuration, so a sliding attack is one mask and one lookup
+    masks = []
+    tables = []
+    for sq in range(64):
+        mask = _sliding_attacks(sq, 0, directions) & ~_edges(sq)
+        table = {}
+        subset = 0
+        while True:  # Carry-rippler walk over all subsets of the mask
+            table[subset] = _sliding_attacks(sq, subset, directions)
+            subset = (subset - mask) & mask
+            if not subset:
+                break
+        masks.append(mask)
+        tables.append(table)
+    return masks, tables
+
+
+ROOK_MASKS, ROOK_TABLES = _attack_table(ROOK_DIRECTIONS)
+BISHOP_MASKS, BISHOP_TABLES = _attack_table(BISHOP_DIRECTIONS)
+
+
+def rook_attacks(sq, occupied):
+    return ROOK_TABLES[sq][occupied & ROOK_MASKS[sq]]
+
+
+def bishop_attacks(sq, occupied):
+    return BISHOP_TABLES[sq][occupied & BISHOP_MASKS[sq]]
+
+
+def queen_attacks(sq, occupied):
+    return ROOK_TABLES[sq][occupied & ROOK_MASKS[sq]] | BISHOP_TABLES[sq][occupied & BISHOP_MASKS[sq]]
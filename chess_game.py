@@ -1,5 +1,5 @@
 from PyQt5.QtWidgets import QMainWindow, QApplication, QLabel, QVBoxLayout, QWidget, QDockWidget, QMessageBox, QLineEdit
-from PyQt5.QtCore import QThread, pyqtSignal, pyqtSlot
+from PyQt5.QtCore import QObject, QThread, QTimer, pyqtSignal, pyqtSlot
 import sys
 from PyQt5.QtWidgets import QMainWindow, QGraphicsView, QDockWidget, QVBoxLayout, QPushButton, QColorDialog, QWidget
 from PyQt5.QtCore import Qt
@@ -9,6 +9,14 @@ from PyQt5.QtCore import QMutex, QMutexLocker
 import time
 import chess
 import sqllite3_database
+import xml_move_history
+import game_record
+from game_status import GameStatus, ONGOING, CHECKMATE, TIME_OUT, STATUS_MESSAGES
+from game_clock import GameClock, TIME_CONTROLS, NS
+from game_events import event_bus, MoveMade, TurnChanged, GameOver, PositionLoaded, MoveTakenBack
+from position import Position, Move
+from engine import allocate_time
+from engine_service import EngineService
 import json
 import socket
 
@@ -60,138 +68,131 @@ class ServerThread(QThread):
             self.client_socket.sendall(message.encode('utf-8'))
 
 
-class TurnWorker(QThread):
-    update_turn = pyqtSignal(str)  # Signal to update the turn
-
-    def __init__(self):
-        super().__init__()
-
-    def run(self):
-        last_turn = None
-        while True:
-            time.sleep(0.2)  # Use a short sleep to prevent high CPU usage
-            with QMutexLocker(turn_mutex):
-                current_turn = "White" if turn.is_white_move else "Black"  # Convert the boolean to a string
-            if current_turn != last_turn:
-                self.update_turn.emit(current_turn)  # Emit the user-friendly turn information
-                last_turn = current_turn
-
-
-class ClockWorker(QThread):
+class ChessClock(QObject):
+    # Qt side of game_clock.GameClock: sides switch on the event bus the moment a move is
+    # committed, and the timer only refreshes the display, it keeps no time of its own
     update_time = pyqtSignal(str, str)  # Signal to update the time for both players
-    time_out = pyqtSignal(str)
 
-    def __init__(self):
-        super().__init__()
+    def __init__(self, parent=None):
+        super().__init__(parent)
         self.mode = "def"  # Default mode
-        self.white_time = self.initial_time()  # Initialize time for White
-        self.black_time = self.initial_time()  # Initialize time for Black
-        self.last_update = time.time()
-        self.current_turn = "White"
-        self.running = True
+        self.clock = GameClock(TIME_CONTROLS[self.mode])
+        self.started = False  # The clocks start once White has made the first move
+        self.timer = QTimer(self)
+        self.timer.setInterval(100)  # Refresh the display at 10 Hz
+        self.timer.timeout.connect(self.tick)
+        event_bus.turn_changed.connect(self.on_turn_changed)
+        event_bus.move_taken_back.connect(self.on_move_taken_back)
+        event_bus.position_loaded.connect(self.on_position_loaded)
+        event_bus.game_over.connect(self.stop)
 
     def set_mode(self, mode):
         self.mode = mode
-        self.white_time = self.initial_time()
-        self.black_time = self.initial_time()
-        self.last_update = time.time()
-
-    def initial_time(self):
-        # Set the initial time based on the mode
-        if self.mode == "10min" or self.mode == "10min_increment":
-            return 10 * 60  # 10 minutes
-        elif self.mode == "5min":
-            return 5 * 60  # 5 minutes
-        elif self.mode == "def":
-            return 10 * 3600  # 5 minutes
-        return 10 * 3600  # Default to 10 minutes
-
-    def run(self):
-        start = False
-        while self.running:
-            time.sleep(1)  # Update the clock every second
-            if turn.game_over:
-                self.running = False  # Stop the loop if the game is over
-                break
-            current_time = time.time()
-            elapsed = current_time - self.last_update
-            self.last_update = current_time
-
-            with QMutexLocker(turn_mutex):
-                new_turn = "White" if turn.is_white_move else "Black"
-
-                if self.mode == "10min_increment" and new_turn != self.current_turn:
-                    # Add 15 seconds increment for the new turn
-                    if new_turn == "Black":
-                        self.white_time += 15
-                    else:
-                        self.black_time += 15
-
-                if new_turn == "Black":
-                    start = True
-                if start:
-                    if new_turn == "White":
-                        self.white_time -= elapsed
-                    else:
-                        self.black_time -= elapsed
-
-                if self.white_time <= 0:
-                    turn.win_by_time = "black"
-                    self.time_out.emit("Black wins by time!")
-                    self.running = False  # Stop the clock
-                elif self.black_time <= 0:
-                    turn.win_by_time = "white"
-                    self.time_out.emit("White wins by time!")
-                    self.running = False  # Stop the clock
-                # Check for turn change
-                self.current_turn = new_turn  # Update the turn for the next iteration
-
-            # Emit the updated times
-            self.update_time.emit(self.format_time(max(0, self.white_time)),
-                                  self.format_time(max(0, self.black_time)))
+        white_to_move = self.clock.white_to_move
+        running = self.clock.running
+        self.clock.reset(TIME_CONTROLS[mode])
+        if running:
+            self.clock.start(white_to_move)
+        self.emit_time()
+
+    def increment(self):
+        return TIME_CONTROLS[self.mode].bonus
+
+    def remaining_time(self, white):
+        return max(0, self.clock.remaining_ns(white)) / NS
+
+    @pyqtSlot()
+    def tick(self):
+        if turn.game_over:
+            self.stop()
+            return
+        self.emit_time()
+        flagged = self.clock.flagged()
+        if flagged:
+            self.stop()  # Before publishing: the game over popup blocks in a nested event loop
+            turn.game_over = True
+            turn.win_by_time = "black" if flagged == "white" else "white"
+            event_bus.publish(GameOver(TIME_OUT, "Black wins by time!" if flagged == "white"
+                                       else "White wins by time!"))
+
+    @pyqtSlot(object)
+    def on_turn_changed(self, event):
+        if event.white_to_move == self.clock.white_to_move or turn.game_over:
+            return
+        if not self.started:
+            self.started = True
+            self.clock.start(event.white_to_move)
+            self.timer.start()
+        else:
+            self.clock.switch()
+        self.tick()
+
+    @pyqtSlot(object)
+    def on_position_loaded(self, event):
+        # Published before the TurnChanged of the load, which then finds the clock already switched
+        self.clock.set_turn(turn.is_white_move)  # Already set from the loaded position
+        self.emit_time()
+
+    @pyqtSlot(object)
+    def on_move_taken_back(self, event):
+        # Published before the TurnChanged of the undo, which then finds the clock already switched
+        if not self.started:
+            return
+        self.clock.take_back()
+        if not self.clock.running:  # Taken back past the end of the game
+            self.clock.start(self.clock.white_to_move)
+            self.timer.start()
+        self.tick()
+
+    @pyqtSlot(object)
+    def stop(self, event=None):
+        self.clock.stop()
+        self.timer.stop()
+        self.emit_time()
+
+    def emit_time(self):
+        self.update_time.emit(self.format_time(self.remaining_time(True)),
+                              self.format_time(self.remaining_time(False)))
 
     def format_time(self, seconds):
-        # Format the time as H:M:S
+        # Format the time as H:M:S, with tenths in the last ten seconds
+        if seconds < 10:
+            return time.strftime('%H:%M:%S', time.gmtime(seconds)) + f".{int(seconds * 10) % 10}"
         return time.strftime('%H:%M:%S', time.gmtime(seconds))
-class MoveWorker(QThread):
-    update_last_move = pyqtSignal(str)  # Signal to update the last move made
 
-    def __init__(self):
-        super().__init__()
-        self.last_checked = -2  # Initialize to check the first two moves initially
+
+class AIPlayer(QObject):
+    # Plays White. Woken only by move and position events, it owns no thread:
+    # the engine service searches in its own process and the result comes back as a signal.
+    move_ready = pyqtSignal(str, str, object)  # FEN searched, best move (UCI), search stats
+
+    def __init__(self, engine_service, clock, parent=None):
+        super().__init__(parent)
+        self.engine_service = engine_service
+        self.clock = clock
+        self.running = False
+        event_bus.move_made.connect(self.on_position)
+        event_bus.position_loaded.connect(self.on_position)
+
+    def start(self, fen):
         self.running = True
+        turn.ai_player = True
+        self.on_position(PositionLoaded(fen))
+
+    def stop(self):
+        self.running = False
+        turn.ai_player = False
+        self.engine_service.cancel()
+
+    @pyqtSlot(object)
+    def on_position(self, event):
+        fen = event.fen
+        if not self.running or turn.game_over or fen.split(' ')[1] != 'w':
+            return
+        time_limit = allocate_time(self.clock.remaining_time(True), self.clock.increment())
+        self.engine_service.search(fen, self.move_ready.emit, time_limit=time_limit)
+
 
-    def run(self):
-        while self.running:
-            time.sleep(1)  # Update the clock every second
-            if turn.game_over:
-                self.running = False  # Stop the loop if the game is over
-                break  # Check for new moves every 0.2 seconds
-            with QMutexLocker(turn_mutex):
-                moves_count = len(turn.last_moves)
-                if moves_count > self.last_checked and moves_count >= 2:
-                    last_move = self.determine_last_move(turn.last_moves[-2], turn.last_moves[-1])
-                    self.update_last_move.emit(last_move)
-                    self.last_checked = moves_count
-
-    def determine_last_move(self, prev_fen, current_fen):
-        board_prev = chess.Board(prev_fen)
-        board_current = chess.Board(current_fen)
-        move = None
-        for move in board_prev.legal_moves:
-            board_prev.push(move)
-            if board_prev.fen() == board_current.fen():
-                return move.uci()  # Returns the move in UCI (Universal Chess Interface) notation
-            board_prev.pop()
-        return "Unknown Move"
-
-class AIWorker(QThread):
-    new_fen_signal = pyqtSignal(str)  # Signal to send FEN string to the main thread
-    def run(self):
-        while True:
-            time.sleep(0.5)  # Check condition half a second
-            if turn.ai_player and turn.is_white_move:
-                self.parent().make_ai_move()
 class FenWorker(QThread):
     update_board = pyqtSignal(str)
 
@@ -210,22 +211,27 @@ class FenWorker(QThread):
 class ChessGame(QMainWindow):
     def __init__(self):
         super().__init__()
-        self.fen_db = sqllite3_database.FenDatabase('fen_database.db')
-        self.fen_db.clear_database()  # Clear the database at the start of the program
+        self.fen_db = sqllite3_database.FenDatabase('fen_database.db')  # Games of every session are kept
+        self.fen_xml = xml_move_history.FenXMLWriter()
+        self.fen_xml.clear_file()
+        self.new_game("rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1")
 
         self.setWindowTitle("Gra w szachy")
         self.setGeometry(100, 100, 800, 600)
 
-        self.chessboard = Chessboard("rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1")
+        self.game_status = GameStatus()  # Shared with the board, which resets it on every loaded position
+        self.chessboard = Chessboard("rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1", self.game_status)
         self.view = QGraphicsView(self.chessboard, self)
         self.setCentralWidget(self.view)
 
         self.settings = {
             "ip": "",
             "port": "",
-            "mode": "2-player"  # Default mode
+            "mode": "2-player",  # Default mode
+            "search_workers": 1,  # Processes the bot searches on
+            "tt_size_mb": 16  # Transposition table size of the bot
         }
-        # self.load_settings()
+        self.load_settings()
 
         # Create a dock widget
         self.dock_widget = QDockWidget("Game Status", self)
@@ -266,21 +272,27 @@ class ChessGame(QMainWindow):
         self.port_input = QLineEdit()
         self.port_input.setPlaceholderText("Enter port number")
         layout.addWidget(self.port_input)
+        self.ip_input.setText(self.settings["ip"])
+        self.port_input.setText(self.settings["port"])
 
         # Button to update IP and Port
         self.update_ipport_button = QPushButton("Update IP and Port")
         layout.addWidget(self.update_ipport_button)
         self.update_ipport_button.clicked.connect(self.update_ipport_from_input)
 
-        # Start the thread to update turns
-        self.turn_thread = TurnWorker()
-        self.turn_thread.update_turn.connect(self.update_turn)
-        self.turn_thread.start()
+        event_bus.turn_changed.connect(self.update_turn)
+        event_bus.move_made.connect(self.update_last_move)
+        event_bus.move_made.connect(self.store_move)  # Player and bot moves alike
+        event_bus.game_over.connect(self.on_game_over)
+        self.turn_label.setText("Current turn: White")
 
-        # Load Last FEN Button
-        self.load_last_fen_button = QPushButton("Load Last Move")
-        layout.addWidget(self.load_last_fen_button)
-        self.load_last_fen_button.clicked.connect(self.load_and_display_last_fen)
+        # Undo and redo buttons
+        self.undo_button = QPushButton("Undo Move")
+        layout.addWidget(self.undo_button)
+        self.undo_button.clicked.connect(self.undo_move)
+        self.redo_button = QPushButton("Redo Move")
+        layout.addWidget(self.redo_button)
+        self.redo_button.clicked.connect(self.redo_move)
 
         self.fen_label = QLabel("FEN")
         layout.addWidget(self.fen_label)
@@ -297,10 +309,9 @@ class ChessGame(QMainWindow):
         self.last_move_label = QLabel("Last Move: ")
         layout.addWidget(self.last_move_label)
 
-        # Start the thread to update the last move
-        self.move_thread = MoveWorker()
-        self.move_thread.update_last_move.connect(self.update_last_move)
-        self.move_thread.start()
+        # Label to display the bot's last search
+        self.search_label = QLabel("Bot search: ")
+        layout.addWidget(self.search_label)
 
         self.btn_10min = QPushButton("10 Min Countdown")
         layout.addWidget(self.btn_10min)
@@ -308,11 +319,17 @@ class ChessGame(QMainWindow):
         layout.addWidget(self.btn_10min_increment)
         self.btn_5min = QPushButton("5 Min Countdown")
         layout.addWidget(self.btn_5min)
+        self.btn_5min_bronstein = QPushButton("5 Min + 3 Sec Bronstein")
+        layout.addWidget(self.btn_5min_bronstein)
+        self.btn_3min_delay = QPushButton("3 Min + 2 Sec Delay")
+        layout.addWidget(self.btn_3min_delay)
 
         # Connect buttons to their respective slot functions
         self.btn_10min.clicked.connect(lambda: self.set_clock_mode("10min"))
         self.btn_10min_increment.clicked.connect(lambda: self.set_clock_mode("10min_increment"))
         self.btn_5min.clicked.connect(lambda: self.set_clock_mode("5min"))
+        self.btn_5min_bronstein.clicked.connect(lambda: self.set_clock_mode("5min_bronstein"))
+        self.btn_3min_delay.clicked.connect(lambda: self.set_clock_mode("3min_delay"))
 
 
         # Chess clock labels
@@ -321,20 +338,18 @@ class ChessGame(QMainWindow):
         layout.addWidget(self.white_clock_label)
         layout.addWidget(self.black_clock_label)
 
-        # Start the thread to update the chess clock
-        self.clock_thread = ClockWorker()
-        self.clock_thread.update_time.connect(self.update_clock)
-        self.clock_thread.time_out.connect(self.show_winner_popup)  # Connect the time_out signal
-        self.clock_thread.start()
+        self.clock = ChessClock(self)
+        self.clock.update_time.connect(self.update_clock)
+        self.clock.emit_time()
 
         self.server_thread = ServerThread('127.0.0.1', 65432)  # Przykładowy IP i port
         self.server_thread.received_fen.connect(self.update_board_from_fen_ip)
         self.server_thread.start()
 
-        self.ai_worker = AIWorker()
-        self.ai_worker.setParent(self)
-        self.ai_worker.new_fen_signal.connect(self.update_board)
-        self.ai_worker.start()
+        self.engine_service = EngineService(tt_size_mb=self.settings["tt_size_mb"],
+                                            workers=self.settings["search_workers"])
+        self.ai_player = AIPlayer(self.engine_service, self.clock, self)
+        self.ai_player.move_ready.connect(self.apply_ai_move)
     def update_ipport_from_input(self):
         self.settings["ip"] = self.ip_input.text().strip()  # Use strip() to remove any leading/trailing whitespace
         self.settings["port"] = self.port_input.text().strip()
@@ -347,50 +362,79 @@ class ChessGame(QMainWindow):
     def load_settings(self):
         try:
             with open('settings.json', 'r') as f:
-                self.settings = json.load(f)
-            # Update the UI based on loaded settings
-            self.ip_input.setText(self.settings.get("ip", ""))
-            self.port_input.setText(self.settings.get("port", ""))
-            # Update mode based on settings, if necessary
+                self.settings.update(json.load(f))  # Keys missing from the file keep their defaults
         except FileNotFoundError:
             pass  # File not found, will use default settings
 
     def switch_to_two_player_mode(self):
         self.settings["mode"] = "2-player"
+        self.ai_player.stop()
         self.save_settings()
         # Additional logic for switching to two-player mode...
 
     def switch_to_ai_mode(self):
         self.settings["mode"] = "AI"
-        turn.ai_player = True
+        self.ai_player.start(self.chessboard.position.fen())
         self.save_settings()
 
-    def load_and_display_last_fen(self):
-        last_fen = self.fen_db.get_last_fen_string()
-        if last_fen:
-            self.update_board(last_fen)
-            self.fen_db.delete_fen_string(last_fen)  # Delete the FEN string after displaying it
-            # Additional logic as needed...
-        else:
-            self.show_message("No previous moves found in the database.")
+    def undo_move(self):
+        # Against the bot both its reply and the player's move go, so it is the player's turn again
+        if not self.take_back_move():
+            self.show_message("No moves to undo.")
+            return
+        if self.ai_player.running and turn.is_white_move:
+            self.take_back_move()
+        event_bus.publish(PositionLoaded(self.chessboard.position.fen()))
+
+    def take_back_move(self):
+        # The board undoes the move in place; the database only gets a queued delete
+        record = self.chessboard.undo_move()
+        if record is None:
+            return False
+        with QMutexLocker(turn_mutex):
+            turn.last_moves.pop()
+            turn.move_history.pop()
+        turn.game_over = False
+        self.fen_db.delete_moves_from(self.game_id, self.ply)
+        self.ply -= 1
+        self.game_moves.pop()
+        event_bus.publish(MoveTakenBack(self.chessboard.position.fen(), record))
+        event_bus.publish(TurnChanged(turn.is_white_move))
+        return True
+
+    def redo_move(self):
+        record = self.chessboard.redo_move()
+        if record is None:
+            self.show_message("No moves to redo.")
+            return
+        self.publish_move(record)
 
     def set_clock_mode(self, mode):
-        self.clock_thread.set_mode(mode)
+        self.clock.set_mode(mode)
 
     def update_board_from_fen(self):
         fen_str = self.fen_input.text()  # Get the FEN string from QLineEdit
         self.update_board(fen_str)  # Call the method to update the board with this FEN string
+        self.new_game(fen_str)
+
+    def new_game(self, fen):
+        # Moves from here on are stored under a new game in the history database
+        self.game_id = self.fen_db.start_game(fen)
+        self.ply = 0
+        self.start_fen = fen
+        self.game_moves = []  # position.Move of every ply, archived when the game ends
+        self.archived = False  # A game finished again after an undo is archived only once
 
     def update_board_from_fen_ip(self, fen):
         if self.validate_fen(fen):
             print("lol")
             print(fen)
             self.update_board(fen)
+            self.new_game(fen)
             if not turn.is_white_move:  # Zakładając, że 'is_white_move' jest True, gdy ruch mają białe
                 self.server_thread.send_message("Aktualnie ruch mają czarne. Ruch bialych jest oczekiwany.")
                 return
             self.fen_input.setText(fen)  # Aktualizuje pole tekstowe z FEN
-            self.update_board(fen)  # Aktualizuje planszę
         else:
             self.server_thread.send_message("Wiadomosc wyslana.")
             self.show_message(f"Otrzymano wiadomosc: {fen}")
@@ -420,83 +464,80 @@ class ChessGame(QMainWindow):
         msgBox.setStandardButtons(QMessageBox.Ok)
         msgBox.exec_()
 
-    def make_ai_move(self):
-        if turn.ai_player:
-            current_fen = turn.last_moves[-1]
-            board = chess.Board(current_fen)
-            best_move = self.select_best_move(board)
-            if best_move:
-                board.push(best_move)
-                new_fen = board.fen()
-                turn.last_moves.append(new_fen)
-                self.ai_worker.new_fen_signal.emit(new_fen)
-    def alpha_beta(self,board, depth, alpha, beta, maximizing_player):
-        if depth == 0 or board.is_game_over():
-            return self.evaluate_board(board)
-
-        if maximizing_player:
-            max_eval = float('-inf')
-            for move in board.legal_moves:
-                board.push(move)
-                eval = self.alpha_beta(board, depth - 1, alpha, beta, False)
-                board.pop()
-                max_eval = max(max_eval, eval)
-                alpha = max(alpha, eval)
-                if beta <= alpha:
-                    break
-            return max_eval
-        else:
-            min_eval = float('inf')
-            for move in board.legal_moves:
-                board.push(move)
-                eval = self.alpha_beta(board, depth - 1, alpha, beta, True)
-                board.pop()
-                min_eval = min(min_eval, eval)
-                beta = min(beta, eval)
-                if beta <= alpha:
-                    break
-            return min_eval
-
-    def select_best_move(self, board, depth=3):
-        best_move = None
-        best_value = float('-inf')
-        alpha = float('-inf')
-        beta = float('inf')
-
-        for move in board.legal_moves:
-            board.push(move)
-            move_value = self.alpha_beta(board, depth - 1, alpha, beta, False)
-            board.pop()
-            if move_value > best_value:
-                best_value = move_value
-                best_move = move
-                alpha = max(alpha, move_value)
-
-        return best_move
-    def evaluate_board(self,board):
-        # A simple evaluation function to score the board position
-        # You can develop a more complex function based on position, material, etc.
-        score = 0
-        for piece in board.piece_map().values():
-            if piece.color == chess.WHITE:
-                score += 1
-            else:
-                score -= 1
-        return score
-    @pyqtSlot(str)
-    def update_turn(self, turn):
-        print(turn)
-        self.turn_label.setText(f"Current turn: {turn}")
+    @pyqtSlot(str, str, object)
+    def apply_ai_move(self, fen, uci, stats):
+        if not self.ai_player.running or not uci or Position(fen).key() != self.chessboard.position.key():
+            return  # The bot was stopped or the board changed while it was thinking
+        self.search_label.setText(f"Bot search: depth {stats['depth']}, {stats['nodes']} nodes, "
+                                  f"{stats['nps']} nps, {stats['first_move_cutoff_rate']}% first-move cutoffs")
+        self.publish_move(self.chessboard.play_move(Move.from_uci(uci)))
+
+    def publish_move(self, record):
+        # Announces a move the board has already made, as pieces.make_a_move does for dragged pieces
+        new_fen = self.chessboard.position.fen()
+        with QMutexLocker(turn_mutex):
+            turn.last_moves.append(new_fen)
+            turn.move_history.append(record)
+        status = self.game_status.current
+        if status != ONGOING:
+            turn.game_over = True
+        event_bus.publish(MoveMade(new_fen, record))
+        event_bus.publish(TurnChanged(turn.is_white_move))
+        if status == CHECKMATE:
+            event_bus.publish(GameOver(status, "Mat! Wygrywają czarne!" if turn.is_white_move
+                                       else "Mat! Wygrywają Białe!"))
+        elif status != ONGOING:
+            event_bus.publish(GameOver(status, STATUS_MESSAGES[status]))
+
+    @pyqtSlot(object)
+    def store_move(self, event):
+        self.fen_xml.add_fen_notation(event.fen)  # Closed off on the next flush
+        self.ply += 1
+        self.game_moves.append(Move(event.record.from_square, event.record.to_square, event.record.promotion))
+        mover_is_white = event.fen.split(' ')[1] == 'b'
+        clock_ms = int(self.clock.remaining_time(mover_is_white) * 1000)
+        # Queued, committed by the database's writer thread
+        self.fen_db.record_move(self.game_id, self.ply, event.record.uci, event.record.san, event.fen,
+                                event.record.zobrist, clock_ms)
+
+    def closeEvent(self, event):
+        self.ai_player.stop()
+        self.engine_service.shutdown()
+        self.fen_db.close()
+        self.fen_xml.close()
+        super().closeEvent(event)
+
+    @pyqtSlot(object)
+    def update_turn(self, event):
+        self.turn_label.setText(f"Current turn: {'White' if event.white_to_move else 'Black'}")
 
     @pyqtSlot(str)
     def update_board(self, fen):
-        self.chessboard = Chessboard(fen)
-        self.view = QGraphicsView(self.chessboard, self)
-        self.setCentralWidget(self.view)
-
-    @pyqtSlot(str)
-    def update_last_move(self, move):
-        self.last_move_label.setText(f"Last Move: {move}")
+        self.show_position(fen)
+        event_bus.publish(PositionLoaded(fen))
+        event_bus.publish(TurnChanged(turn.is_white_move))
+
+    def show_position(self, fen):
+        # The scene and view are built once; later positions only touch the pieces that changed
+        self.chessboard.set_position(fen)
+
+    @pyqtSlot(object)
+    def update_last_move(self, event):
+        self.last_move_label.setText(f"Last Move: {event.record.san}")
+
+    @pyqtSlot(object)
+    def on_game_over(self, event):
+        if event.status in (CHECKMATE, TIME_OUT):
+            white_won = not turn.is_white_move if event.status == CHECKMATE else turn.win_by_time == "white"
+            result = "1-0" if white_won else "0-1"
+        else:
+            result = "1/2-1/2"
+        self.fen_db.finish_game(self.game_id, result)
+        self.fen_xml.flush()
+        if not self.archived:
+            game_record.append_game('game_archive.chgr', self.start_fen, self.game_moves, result)
+            self.archived = True
+        self.show_winner_popup(event.message)
 
     @pyqtSlot(str, str)
     def update_clock(self, white_time, black_time):
@@ -1,15 +1,32 @@
-from PyQt5.QtCore import QPointF
 from PyQt5.QtWidgets import QGraphicsScene, QGraphicsPixmapItem
 from PyQt5.QtGui import QBrush, QColor, QPixmap
 
 import turn
+from position import Position, Move, PIECE_LETTERS
+from fen import EMPTY, parse_fen
+from notation import push_move
+from game_status import GameStatus
+from bitboards import WHITE, PAWN, KING, square, square_file, square_rank, square_name
 from pieces import Pawn, Rook, Knight, Bishop, Queen, King
 import items_rc
 
+# Mapping from FEN notation to the Piece classes and their colors
+PIECE_MAP = {
+    'p': (Pawn, 'black'), 'r': (Rook, 'black'), 'n': (Knight, 'black'), 'b': (Bishop, 'black'),
+    'q': (Queen, 'black'), 'k': (King, 'black'),
+    'P': (Pawn, 'white'), 'R': (Rook, 'white'), 'N': (Knight, 'white'), 'B': (Bishop, 'white'),
+    'Q': (Queen, 'white'), 'K': (King, 'white')
+}
+
+
 class Chessboard(QGraphicsScene):
-    def __init__(self,fen, parent=None):
+    def __init__(self,fen, game_status=None, parent=None):
         super().__init__(parent)
+        self.game_status = game_status if game_status is not None else GameStatus()
         self.square_items = []  # Add a list to keep track of square items
+        self.board = [None] * 64  # Piece item on every square, a1 = 0 as in Position
+        self.history = []  # MoveRecord of every move pushed on self.position, for undo
+        self.redo_stack = []  # Records of undone moves, the next one to redo last
         self.setBackgroundBrush(QBrush(QColor(210, 180, 140)))  # Set background color
         self.drawBoard()
         self.setupPieces(fen)
@@ -35,54 +52,186 @@ class Chessboard(QGraphicsScene):
         self.addItem(piece)
 
     def setupPieces(self, fen):
-        parts = fen.split(' ')
-        piece_positions = parts[0].split('/')
-        active_color = parts[1]
-        if active_color == 'w':
-            turn.is_white_move = True
-        else: turn.is_white_move = False
-        castling_availability = parts[2]
-        en_passant_target = parts[3]
-        turn.en_passant_notation = en_passant_target
-        turn.halfmoves = int(parts[4]) if len(parts) > 4 else 0
-        turn.total_moves = int(parts[5]) if len(parts) > 5 else 1
-        # Define a mapping from FEN notation to the Piece classes and their colors
-        piece_map = {
-            'p': (Pawn, 'black'), 'r': (Rook, 'black'), 'n': (Knight, 'black'), 'b': (Bishop, 'black'),
-            'q': (Queen, 'black'), 'k': (King, 'black'),
-            'P': (Pawn, 'white'), 'R': (Rook, 'white'), 'N': (Knight, 'white'), 'B': (Bishop, 'white'),
-            'Q': (Queen, 'white'), 'K': (King, 'white')
-        }
-
-        for row, row_data in enumerate(piece_positions):
-            col = 0
-            for char in row_data:
-                if char.isdigit():
-                    # Skip the number of squares indicated by the digit
-                    col += int(char)
+        self.set_position(fen)
+
+    def set_position(self, fen):
+        # Applies a FEN to the scene by moving, adding or removing only the pieces that differ
+        self.position = Position(fen)  # Rules are checked against this model, not the scene
+        self.history = []
+        self.redo_stack = []
+        self.game_status.clear()  # Repetitions count from the loaded position on
+        self.game_status.record(self.position)
+        fields = parse_fen(fen)
+        turn.is_white_move = fields.turn == 'w'
+        castling_availability = fields.castling
+        turn.en_passant_notation = fields.ep
+        turn.halfmoves = fields.halfmove_clock
+        turn.total_moves = fields.fullmove_number
+
+        wanted = {}  # (col, row) -> FEN letter
+        for sq, char in enumerate(fields.board):
+            if char != EMPTY:
+                wanted[(square_file(sq), 7 - square_rank(sq))] = char
+
+        placed = {}
+        spare = {}  # FEN letter -> items no longer standing on a square that wants them
+        for sq, item in enumerate(self.board):
+            if item is not None:
+                key = (square_file(sq), 7 - square_rank(sq))
+                char = item.piece_to_fen(item)
+                if wanted.get(key) == char:
+                    placed[key] = item
                 else:
-                    # Retrieve the piece class and color, and create a new instance
-                    piece_class, color = piece_map[char]
-                    piece = piece_class(color)
-                    piece.setPos(col * 60, row * 60)
-                    self.addItem(piece)
-
-                    if piece_class == Pawn and color == 'white' and row != 6:
-                        piece.first_move = False
-                        print("lol")
-                    if piece_class == Pawn and color == 'black' and row != 1:
-                        piece.first_move = False
-                    if 'K' not in castling_availability:
-                        if piece_class == Rook and color == 'white' and piece.pos() != QPointF(0 * 60, 7 * 60):
-                            piece.first_move = False
-                    if 'Q' not in castling_availability:
-                        if piece_class == Rook and color == 'white' and piece.pos() != QPointF(7 * 60, 7 * 60):
-                            piece.first_move = False
-                    if 'k' not in castling_availability:
-                        if piece_class == Rook and color == 'black' and piece.pos() != QPointF(0 * 60, 0 * 60):
-                            piece.first_move = False
-                    if 'q' not in castling_availability:
-                        if piece_class == Rook and color == 'black' and piece.pos() != QPointF(7 * 60, 0 * 60):
-                            piece.first_move = False
-                    col += 1
+                    spare.setdefault(char, []).append(item)
+
+        for key, char in wanted.items():
+            if key in placed:
+                continue
+            if spare.get(char):
+                piece = spare[char].pop()  # A piece that moved keeps its item
+            else:
+                piece_class, color = PIECE_MAP[char]
+                piece = piece_class(color)
+                self.addItem(piece)
+            piece.setPos(key[0] * 60, key[1] * 60)
+            placed[key] = piece
+        for items in spare.values():
+            for item in items:
+                item.square = None
+                self.removeItem(item)
+
+        self.board = [None] * 64
+        for (col, row), piece in placed.items():
+            piece.square = square(col, 7 - row)
+            self.board[piece.square] = piece
+            self.set_first_move(piece, col, row, castling_availability)
+
+    def piece_at_square(self, sq):
+        return self.board[sq]
+
+    def add_piece(self, letter, sq):
+        piece_class, color = PIECE_MAP[letter]
+        piece = piece_class(color)
+        self.addItem(piece)
+        self.place_piece(piece, sq)
+        return piece
+
+    def add_to_history(self, record):
+        # A move made on self.position by dragging a piece; it forgets the moves there were to redo
+        self.history.append(record)
+        self.redo_stack.clear()
+
+    def play_move(self, move):
+        self.redo_stack.clear()
+        return self.apply_move(move)
+
+    def apply_move(self, move):
+        # Makes a legal move on the position and moves only the items on the squares it touches
+        pos = self.position
+        from_sq, to_sq = move.from_square, move.to_square
+        piece = self.board[from_sq]
+        piece_type = pos.piece_type_at(from_sq)
+        captured_sq = to_sq
+        if piece_type == PAWN and to_sq == pos.ep_square:
+            captured_sq = to_sq - 8 if pos.turn == WHITE else to_sq + 8
+        if self.board[captured_sq] is not None:
+            self.take_piece(self.board[captured_sq])
+        if pos.is_castling(move):
+            rook_from, rook_to = (from_sq + 3, from_sq + 1) if to_sq > from_sq else (from_sq - 4, from_sq - 1)
+            self.place_piece(self.board[rook_from], rook_to)
+        if move.promotion is not None:
+            self.take_piece(piece)
+            piece = self.add_piece(PIECE_LETTERS[pos.turn][move.promotion], to_sq)
+        else:
+            self.place_piece(piece, to_sq)
+        if hasattr(piece, 'first_move'):
+            piece.first_move = False
+        record = push_move(pos, move)
+        self.game_status.record(pos)
+        self.history.append(record)
+        self.sync_turn()
+        return record
+
+    def undo_move(self):
+        # Takes the last move back: the position pops its own delta (castling, en passant and
+        # halfmove clock before the move) and the record says which items to put back.
+        # Returns the record, or None when there is nothing to undo.
+        if not self.history:
+            return None
+        record = self.history.pop()
+        self.game_status.undo()
+        pos = self.position
+        pos.pop()
+        us = pos.turn
+        from_sq, to_sq = record.from_square, record.to_square
+        piece = self.board[to_sq]
+        if record.promotion is not None:
+            self.take_piece(piece)
+            self.add_piece(PIECE_LETTERS[us][PAWN], from_sq)
+        else:
+            self.place_piece(piece, from_sq)
+        if record.piece == KING and abs(to_sq - from_sq) == 2:
+            rook_from, rook_to = (from_sq + 3, from_sq + 1) if to_sq > from_sq else (from_sq - 4, from_sq - 1)
+            self.place_piece(self.board[rook_to], rook_from)
+        if record.captured is not None:
+            captured_sq = to_sq
+            if record.piece == PAWN and to_sq == pos.ep_square:
+                captured_sq = to_sq - 8 if us == WHITE else to_sq + 8
+            self.add_piece(PIECE_LETTERS[us ^ 1][record.captured], captured_sq)
+        self.redo_stack.append(record)
+        self.sync_turn()
+        return record
+
+    def redo_move(self):
+        # Plays the last undone move again; returns its record, or None when there is none
+        if not self.redo_stack:
+            return None
+        record = self.redo_stack.pop()
+        return self.apply_move(Move(record.from_square, record.to_square, record.promotion))
+
+    def sync_turn(self):
+        # The turn module mirrors the position for the rest of the GUI
+        pos = self.position
+        turn.is_white_move = pos.turn == WHITE
+        turn.en_passant = None
+        turn.en_passant_notation = square_name(pos.ep_square) if pos.ep_square is not None else '-'
+        turn.halfmoves = pos.halfmove_clock
+        turn.total_moves = pos.fullmove_number
+
+    def place_piece(self, piece, sq):
+        # Moves an item to a square, both on the board array and on the scene
+        self.release_piece(piece)
+        self.board[sq] = piece
+        piece.square = sq
+        piece.setPos(square_file(sq) * 60, (7 - square_rank(sq)) * 60)
+
+    def release_piece(self, piece):
+        if piece.square is not None and self.board[piece.square] is piece:
+            self.board[piece.square] = None
+        piece.square = None
+
+    def take_piece(self, piece):
+        self.release_piece(piece)
+        self.removeItem(piece)
 
+    def set_first_move(self, piece, col, row, castling_availability):
+        if not hasattr(piece, 'first_move'):
+            return
+        piece.first_move = True
+        color = piece.color
+        if isinstance(piece, Pawn) and color == 'white' and row != 6:
+            piece.first_move = False
+        if isinstance(piece, Pawn) and color == 'black' and row != 1:
+            piece.first_move = False
+        if 'K' not in castling_availability:
+            if isinstance(piece, Rook) and color == 'white' and (col, row) != (0, 7):
+                piece.first_move = False
+        if 'Q' not in castling_availability:
+            if isinstance(piece, Rook) and color == 'white' and (col, row) != (7, 7):
+                piece.first_move = False
+        if 'k' not in castling_availability:
+            if isinstance(piece, Rook) and color == 'black' and (col, row) != (0, 0):
+                piece.first_move = False
+        if 'q' not in castling_availability:
+            if isinstance(piece, Rook) and color == 'black' and (col, row) != (7, 0):
+                piece.first_move = False
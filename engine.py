@@ -0,0 +1,267 @@
+# Alpha-beta search for the chess bot, running on the bitboard Position.
+import time
+
+from bitboards import WHITE, PAWN, KNIGHT, BISHOP, ROOK, QUEEN
+from evaluation import evaluate
+from movegen import generate_legal_moves, generate_legal_captures
+from move_ordering import MoveOrderer
+from transposition import TranspositionTable, EXACT, LOWER_BOUND, UPPER_BOUND
+
+MATE_SCORE = 100000
+MATE_THRESHOLD = MATE_SCORE - 1000
+MAX_DEPTH = 64
+PIECE_VALUES = {PAWN: 100, KNIGHT: 320, BISHOP: 330, ROOK: 500, QUEEN: 900}
+DELTA_MARGIN = 200  # A capture that cannot lift the score this close to the window is skipped
+TIME_CHECK_NODES = 255  # The clock is read once per this many nodes (plus one)
+
+
+class SearchTimeout(Exception):
+    pass
+
+
+def allocate_time(remaining, increment=0.0, moves_to_go=30, max_time=30.0):
+    # Seconds to spend on one move: an even share of the clock plus most of the increment,
+    # never more than a fifth of what is left so the bot cannot flag
+    budget = remaining / moves_to_go + 0.8 * increment
+    return max(0.05, min(budget, remaining * 0.2, max_time))
+
+
+def score_to_tt(score, ply):
+    # Mate scores are stored relative to the node, so they stay valid at any depth of the tree
+    if score > MATE_THRESHOLD:
+        return score + ply
+    if score < -MATE_THRESHOLD:
+        return score - ply
+    return score
+
+
+def score_from_tt(score, ply):
+    if score > MATE_THRESHOLD:
+        return score - ply
+    if score < -MATE_THRESHOLD:
+        return score + ply
+    return score
+
+
+class Engine:
+    def __init__(self, tt_size_mb=16, move_ordering=True, tt_buffer=None):
+        self.tt = TranspositionTable(tt_size_mb, tt_buffer)  # A shared buffer lets processes share it
+        self.orderer = MoveOrderer()
+        self.move_ordering = move_ordering  # Off only to measure how many nodes ordering saves
+        self.nodes = 0
+        self.cutoffs = 0
+        self.first_move_cutoffs = 0
+        self.deadline = None
+        self.stop_check = None  # Optional callable, a true result aborts the search like a timeout
+        self.depth_reached = 0
+
+    def should_stop(self):
+        if self.deadline is not None and time.monotonic() >= self.deadline:
+            return True
+        return self.stop_check is not None and self.stop_check()
+
+    def alpha_beta(self, pos, depth, alpha, beta, maximizing_player, ply=1):
+        # Scores are from White's point of view, White maximizes
+        self.nodes += 1
+        if not self.nodes & TIME_CHECK_NODES and self.should_stop():
+            raise SearchTimeout()
+        alpha_orig, beta_orig = alpha, beta
+        key = pos.zobrist
+        hash_move = None
+        entry = self.tt.probe(key)
+        if entry is not None:
+            tt_depth, tt_score, tt_bound, hash_move = entry
+            if tt_depth >= depth:
+                tt_score = score_from_tt(tt_score, ply)
+                if tt_bound == EXACT:
+                    return tt_score
+                if tt_bound == LOWER_BOUND:
+                    alpha = max(alpha, tt_score)
+                else:
+                    beta = min(beta, tt_score)
+                if alpha >= beta:
+                    return tt_score
+
+        if depth == 0:
+            return self.quiescence(pos, alpha, beta, maximizing_player, ply)
+        moves = generate_legal_moves(pos)
+        if not moves:
+            if pos.is_check():
+                return -(MATE_SCORE - ply) if maximizing_player else MATE_SCORE - ply
+            return 0
+        if self.move_ordering:
+            moves = self.orderer.order(pos, moves, ply, hash_move)
+
+        best_move = None
+        if maximizing_player:
+            best_eval = float('-inf')
+            for index, move in enumerate(moves):
+                pos.push(move)
+                eval = self.alpha_beta(pos, depth - 1, alpha, beta, False, ply + 1)
+                pos.pop()
+                if eval > best_eval:
+                    best_eval = eval
+                    best_move = move
+                alpha = max(alpha, eval)
+                if beta <= alpha:
+                    self.record_cutoff(pos, move, ply, depth, index)
+                    break
+        else:
+            best_eval = float('inf')
+            for index, move in enumerate(moves):
+                pos.push(move)
+                eval = self.alpha_beta(pos, depth - 1, alpha, beta, True, ply + 1)
+                pos.pop()
+                if eval < best_eval:
+                    best_eval = eval
+                    best_move = move
+                beta = min(beta, eval)
+                if beta <= alpha:
+                    self.record_cutoff(pos, move, ply, depth, index)
+                    break
+
+        if best_eval <= alpha_orig:
+            bound = UPPER_BOUND
+        elif best_eval >= beta_orig:
+            bound = LOWER_BOUND
+        else:
+            bound = EXACT
+        self.tt.store(key, depth, score_to_tt(best_eval, ply), bound, best_move)
+        return best_eval
+
+    def quiescence(self, pos, alpha, beta, maximizing_player, ply):
+        # Resolve captures (and check evasions) before trusting the static evaluation
+        self.nodes += 1
+        if not self.nodes & TIME_CHECK_NODES and self.should_stop():
+            raise SearchTimeout()
+
+        if pos.is_check():
+            moves = generate_legal_moves(pos)
+            if not moves:
+                return -(MATE_SCORE - ply) if maximizing_player else MATE_SCORE - ply
+            best_eval = float('-inf') if maximizing_player else float('inf')
+        else:
+            # Stand pat: the side to move is not forced to capture
+            stand_pat = self.evaluate_board(pos)
+            if maximizing_player:
+                if stand_pat >= beta:
+                    return stand_pat
+                alpha = max(alpha, stand_pat)
+            else:
+                if stand_pat <= alpha:
+                    return stand_pat
+                beta = min(beta, stand_pat)
+            best_eval = stand_pat
+            moves = []
+            for move in generate_legal_captures(pos):
+                victim = pos.piece_type_at(move.to_square)
+                gain = PIECE_VALUES[victim] if victim is not None else PIECE_VALUES[PAWN]
+                if move.promotion is not None:
+                    gain += PIECE_VALUES[QUEEN] - PIECE_VALUES[PAWN]
+                # Delta pruning: even winning the piece for free would not reach the window
+                if maximizing_player and stand_pat + gain + DELTA_MARGIN <= alpha:
+                    continue
+                if not maximizing_player and stand_pat - gain - DELTA_MARGIN >= beta:
+                    continue
+                moves.append(move)
+
+        # Always best first here: unordered, the capture tree explodes, and move_ordering=False
+        # is only meant to measure the ordering of the main search
+        moves = self.orderer.order(pos, moves, ply)
+        for move in moves:
+            pos.push(move)
+            eval = self.quiescence(pos, alpha, beta, not maximizing_player, ply + 1)
+            pos.pop()
+            if maximizing_player:
+                best_eval = max(best_eval, eval)
+                alpha = max(alpha, eval)
+            else:
+                best_eval = min(best_eval, eval)
+                beta = min(beta, eval)
+            if beta <= alpha:
+                break
+        return best_eval
+
+    def record_cutoff(self, pos, move, ply, depth, index):
+        self.cutoffs += 1
+        if index == 0:
+            self.first_move_cutoffs += 1
+        if self.move_ordering:
+            self.orderer.record_cutoff(pos, move, ply, depth)
+
+    def search_stats(self):
+        # How well the ordering worked: with good ordering most cutoffs come from the first move
+        first_move_rate = 100.0 * self.first_move_cutoffs / self.cutoffs if self.cutoffs else 0.0
+        return {
+            "nodes": self.nodes,
+            "depth": self.depth_reached,
+            "cutoffs": self.cutoffs,
+            "first_move_cutoff_rate": round(first_move_rate, 1),
+            "move_ordering": self.move_ordering,
+        }
+
+    def select_best_move(self, pos, max_depth=MAX_DEPTH, time_limit=None, start_depth=1):
+        # Iterative deepening: search depth 1, 2, ... and keep the best move of the last
+        # iteration that finished before the time limit (in seconds) ran out. Parallel
+        # helpers start a ply deeper so they run ahead of the main search in the shared table.
+        pos = pos.copy()  # An interrupted search may leave moves pushed on its own copy only
+        self.tt.new_search()
+        self.orderer.new_search()
+        self.nodes = 0
+        self.cutoffs = 0
+        self.first_move_cutoffs = 0
+        self.depth_reached = 0
+        start = time.monotonic()
+        self.deadline = start + time_limit if time_limit is not None else None
+        best_move = None
+        try:
+            for depth in range(min(start_depth, max_depth), max_depth + 1):
+                move = self.search_root(pos, depth)
+                if move is None:
+                    break  # No legal moves
+                best_move = move
+                self.depth_reached = depth
+                # The next iteration costs several times this one, do not start what cannot finish
+                if time_limit is not None and time.monotonic() - start > time_limit * 0.5:
+                    break
+        except SearchTimeout:
+            pass
+        finally:
+            self.deadline = None
+        if best_move is None:
+            # Not even depth 1 finished in time, any legal move beats losing on time
+            moves = generate_legal_moves(pos)
+            best_move = moves[0] if moves else None
+        return best_move
+
+    def search_root(self, pos, depth):
+        maximizing_player = pos.turn == WHITE
+        best_move = None
+        best_value = float('-inf') if maximizing_player else float('inf')
+        alpha = float('-inf')
+        beta = float('inf')
+
+        moves = generate_legal_moves(pos)
+        entry = self.tt.probe(pos.zobrist)
+        if self.move_ordering:
+            moves = self.orderer.order(pos, moves, 0, entry[3] if entry is not None else None)
+
+        for move in moves:
+            pos.push(move)
+            move_value = self.alpha_beta(pos, depth - 1, alpha, beta, not maximizing_player)
+            pos.pop()
+            if maximizing_player and move_value > best_value:
+                best_value = move_value
+                best_move = move
+                alpha = max(alpha, move_value)
+            elif not maximizing_player and move_value < best_value:
+                best_value = move_value
+                best_move = move
+                beta = min(beta, move_value)
+
+        if best_move is not None:
+            self.tt.store(pos.zobrist, depth, score_to_tt(best_value, 0), EXACT, best_move)
+        return best_move
+
+    def evaluate_board(self, pos):
+        return evaluate(pos)
@@ -0,0 +1,140 @@
+# Runs the bot's search in separate processes, so it neither holds the GUI thread's GIL
+# nor touches the game state. A FEN goes in, the best move (UCI) and search stats come out.
+# With more than one worker the search is Lazy SMP: every worker searches the same position
+# and they share one transposition table in shared memory; worker 0's move is played.
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from multiprocessing import shared_memory
+
+from engine import Engine, MAX_DEPTH
+from position import Position
+from transposition import table_bytes
+
+# Set in each worker process by _init_worker
+_engine = None
+_current_search = None
+_shared_tt = None  # Kept referenced while the engine's table lives in it
+
+
+def _init_worker(tt_size_mb, current_search, shared_name):
+    global _engine, _current_search, _shared_tt
+    buffer = None
+    if shared_name is not None:
+        _shared_tt = shared_memory.SharedMemory(name=shared_name)
+        buffer = _shared_tt.buf
+    _engine = Engine(tt_size_mb=tt_size_mb, tt_buffer=buffer)  # Its tables survive between moves
+    _current_search = current_search
+
+
+def _search(fen, search_id, time_limit, max_depth, helper):
+    # A search stops as soon as the service starts another one or cancels this one
+    _engine.stop_check = lambda: _current_search.value != search_id
+    best_move = _engine.select_best_move(Position(fen), max_depth=max_depth, time_limit=time_limit,
+                                         start_depth=1 + (helper & 1))
+    return best_move.uci() if best_move else None, _engine.search_stats()
+
+
+def _clear_worker():
+    _engine.tt.clear()
+    _engine.orderer.clear()
+
+
+class EngineService:
+    def __init__(self, tt_size_mb=16, workers=1):
+        self.workers = max(1, workers)
+        # Spawn instead of fork: the GUI process already runs Qt threads
+        context = multiprocessing.get_context("spawn")
+        self._current_search = context.Value('i', 0)
+        self._shared_tt = None
+        shared_name = None
+        if self.workers > 1:
+            self._shared_tt = shared_memory.SharedMemory(create=True, size=table_bytes(tt_size_mb))
+            shared_name = self._shared_tt.name
+        self._executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=context,
+                                             initializer=_init_worker,
+                                             initargs=(tt_size_mb, self._current_search, shared_name))
+        self._searcher = ThreadPoolExecutor(max_workers=1)  # Waits for results off the GUI thread
+        self._lock = threading.Lock()
+        self._pending = None
+
+    def is_busy(self):
+        return self._pending is not None and not self._pending.done()
+
+    def _next_search_id(self):
+        with self._current_search.get_lock():
+            self._current_search.value += 1
+            return self._current_search.value
+
+    def select_best_move(self, fen, time_limit=None, max_depth=MAX_DEPTH, search_id=None):
+        # Blocking search. Returns (uci, stats), or None when the search was cancelled or
+        # superseded before it finished. Helpers get no time limit, they stop with worker 0.
+        # search_id is one taken earlier by search(); without it the search takes a new one.
+        start = time.monotonic()
+        with self._lock:
+            if search_id is None:
+                search_id = self._next_search_id()
+            elif self._current_search.value != search_id:
+                return None  # Cancelled before it started
+            futures = [self._executor.submit(_search, fen, search_id, time_limit if helper == 0 else None,
+                                             max_depth, helper)
+                       for helper in range(self.workers)]
+        uci, stats = futures[0].result()
+        with self._lock:
+            if self._current_search.value != search_id:
+                return None
+            if self.workers > 1:
+                self._next_search_id()  # Stop the helpers
+        helper_stats = [future.result()[1] for future in futures[1:]]
+        elapsed = time.monotonic() - start
+        stats["nodes"] += sum(helper["nodes"] for helper in helper_stats)
+        stats["workers"] = self.workers
+        stats["time"] = round(elapsed, 3)
+        stats["nps"] = int(stats["nodes"] / elapsed) if elapsed > 0 else 0
+        return uci, stats
+
+    def search(self, fen, callback, time_limit=None, max_depth=MAX_DEPTH):
+        # Non-blocking search. callback(fen, uci, stats) runs on a worker thread, not the GUI
+        # thread; emit a Qt signal from it. A search still running is cancelled first.
+        self.cancel()
+        with self._lock:
+            search_id = self._next_search_id()  # Taken now, so any later cancel() stops this search
+
+        def run():
+            result = self.select_best_move(fen, time_limit=time_limit, max_depth=max_depth, search_id=search_id)
+            if result is not None:
+                callback(fen, *result)
+
+        future = self._searcher.submit(run)
+        future.add_done_callback(self._report_error)
+        self._pending = future
+        return future
+
+    def _report_error(self, future):
+        if not future.cancelled() and future.exception() is not None:
+            print(f"AI search failed: {future.exception()!r}")
+
+    def cancel(self):
+        if self._pending is not None:
+            self._pending.cancel()
+            self._pending = None
+        with self._lock:
+            self._next_search_id()  # Searches that are already running see the new id and stop
+
+    def clear(self):
+        # Forget what earlier searches learnt, e.g. between benchmark runs
+        if self._shared_tt is not None:
+            size = len(self._shared_tt.buf)
+            self._shared_tt.buf[:size] = bytes(size)
+        else:
+            self._executor.submit(_clear_worker).result()
+
+    def shutdown(self):
+        self.cancel()
+        self._searcher.shutdown(wait=False, cancel_futures=True)
+        self._executor.shutdown(wait=True, cancel_futures=True)
+        if self._shared_tt is not None:
+            self._shared_tt.close()
+            self._shared_tt.unlink()
+            self._shared_tt = None
@@ -0,0 +1,55 @@
+# FEN reading and writing on a compact board array: a list of 64 FEN letters, a1 = 0 as
+# in Position, with EMPTY ('1') on empty squares. Digits expand and runs of empties collapse
+# with a handful of str.replace calls, so no square is visited in Python.
+from collections import namedtuple
+
+EMPTY = '1'
+PIECE_LETTERS = 'PNBRQKpnbrqk'
+
+# turn is 'w' or 'b'; castling and ep are the FEN fields as written, '-' when empty
+FenFields = namedtuple('FenFields', ['board', 'turn', 'castling', 'ep', 'halfmove_clock', 'fullmove_number'])
+
+_EXPAND = [(str(n), EMPTY * n) for n in range(2, 9)]
+_COLLAPSE = [(EMPTY * n, str(n)) for n in range(8, 1, -1)]  # Longest runs first
+_RANK_STARTS = range(56, -1, -8)  # FEN lists rank 8 first
+_VALID = set(PIECE_LETTERS + EMPTY)
+
+
+def parse_board(placement):
+    text = placement
+    for digit, run in _EXPAND:
+        text = text.replace(digit, run)
+    rows = text.split('/')
+    if len(rows) != 8 or set(map(len, rows)) != {8}:
+        raise ValueError(f"Invalid FEN board: {placement}")
+    board = ''.join(rows[::-1])
+    if not _VALID.issuperset(board):
+        raise ValueError(f"Invalid FEN board: {placement}")
+    return list(board)
+
+
+def board_fen(board):
+    text = ''.join(board)
+    placement = '/'.join([text[start:start + 8] for start in _RANK_STARTS])
+    for run, digit in _COLLAPSE:
+        placement = placement.replace(run, digit)
+    return placement
+
+
+def parse_fen(fen):
+    # Missing trailing fields take their starting-position defaults
+    parts = fen.split()
+    if not parts:
+        raise ValueError("Empty FEN")
+    turn = parts[1] if len(parts) > 1 else 'w'
+    if turn not in ('w', 'b'):
+        raise ValueError(f"Invalid FEN side to move: {turn}")
+    return FenFields(parse_board(parts[0]), turn,
+                     parts[2] if len(parts) > 2 else '-',
+                     parts[3] if len(parts) > 3 else '-',
+                     int(parts[4]) if len(parts) > 4 else 0,
+                     int(parts[5]) if len(parts) > 5 else 1)
+
+
+def format_fen(board, turn='w', castling='-', ep='-', halfmove_clock=0, fullmove_number=1):
+    return f"{board_fen(board)} {turn} {castling} {ep} {halfmove_clock} {fullmove_number}"
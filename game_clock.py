@@ -0,0 +1,109 @@
+# Qt-free chess clock. Time is read from time.monotonic_ns, so wall-clock jumps cannot touch
+# it, and the sides switch at the exact moment a move is committed, not on a display tick.
+import time
+from collections import namedtuple
+
+FISCHER = 'fischer'      # The bonus is added after every move
+BRONSTEIN = 'bronstein'  # The time used is given back, up to the bonus
+DELAY = 'delay'          # The clock waits for the bonus before it starts counting down
+
+NS = 1000000000
+
+# initial and bonus in seconds; a bonus of 0 is a plain countdown
+TimeControl = namedtuple('TimeControl', ['initial', 'bonus', 'mode'])
+
+TIME_CONTROLS = {
+    "def": TimeControl(10 * 3600, 0, FISCHER),
+    "10min": TimeControl(10 * 60, 0, FISCHER),
+    "10min_increment": TimeControl(10 * 60, 15, FISCHER),
+    "5min": TimeControl(5 * 60, 0, FISCHER),
+    "5min_bronstein": TimeControl(5 * 60, 3, BRONSTEIN),
+    "3min_delay": TimeControl(3 * 60, 2, DELAY),
+}
+
+
+class GameClock:
+    def __init__(self, control=TIME_CONTROLS["def"], now=time.monotonic_ns):
+        self.now = now
+        self.reset(control)
+
+    def reset(self, control):
+        self.control = control
+        self.remaining = [control.initial * NS, control.initial * NS]  # [white, black], in ns
+        self.white_to_move = True
+        self.turn_start = None  # None while the clock is stopped
+        self.bonuses = []  # Bonus ns given for every switch, taken back with the move
+
+    @property
+    def running(self):
+        return self.turn_start is not None
+
+    def start(self, white_to_move=True):
+        self.white_to_move = white_to_move
+        self.turn_start = self.now()
+
+    def charge(self, elapsed):
+        # Time taken off the clock for thinking elapsed ns, before any bonus
+        if self.control.mode == DELAY:
+            return max(0, elapsed - self.control.bonus * NS)
+        return elapsed
+
+    def remaining_ns(self, white):
+        side = 0 if white else 1
+        if self.running and white == self.white_to_move:
+            return self.remaining[side] - self.charge(self.now() - self.turn_start)
+        return self.remaining[side]
+
+    def switch(self):
+        # The side to move committed its move: charge it, add its bonus, start the opponent
+        if not self.running:
+            self.start(not self.white_to_move)
+            return
+        now = self.now()
+        elapsed = now - self.turn_start
+        side = 0 if self.white_to_move else 1
+        self.remaining[side] -= self.charge(elapsed)
+        bonus = 0
+        if self.remaining[side] > 0:  # A flag that has fallen stays down
+            if self.control.mode == FISCHER:
+                bonus = self.control.bonus * NS
+            elif self.control.mode == BRONSTEIN:
+                bonus = min(elapsed, self.control.bonus * NS)
+        self.remaining[side] += bonus
+        self.bonuses.append(bonus)
+        self.white_to_move = not self.white_to_move
+        self.turn_start = now
+
+    def take_back(self):
+        # The last move was taken back: the turn returns to the side that made it. The side
+        # to move is not charged and the bonus the move earned is removed again.
+        if self.bonuses:
+            self.remaining[1 if self.white_to_move else 0] -= self.bonuses.pop()
+        self.white_to_move = not self.white_to_move
+        if self.running:
+            self.turn_start = self.now()
+
+    def set_turn(self, white_to_move):
+        # A position was loaded: the clock follows its side to move. No move was made, so no
+        # bonus is given, and a stopped clock stays stopped.
+        if white_to_move == self.white_to_move:
+            return
+        self.bonuses = []
+        if self.running:
+            self.stop()
+            self.start(white_to_move)
+        else:
+            self.white_to_move = white_to_move
+
+    def stop(self):
+        if self.running:
+            side = 0 if self.white_to_move else 1
+            self.remaining[side] -= self.charge(self.now() - self.turn_start)
+            self.turn_start = None
+
+    def flagged(self):
+        # 'white' or 'black' when that side has run out of time, otherwise None
+        for white, name in ((True, 'white'), (False, 'black')):
+            if self.remaining_ns(white) <= 0:
+                return name
+        return None
@@ -0,0 +1,36 @@
+# Game state events. Code that changes the game publishes what happened here, and widgets
+# subscribe to the signal of the event type they show instead of polling turn.py.
+from collections import namedtuple
+
+from PyQt5.QtCore import QObject, pyqtSignal
+
+MoveMade = namedtuple('MoveMade', ['fen', 'record'])  # FEN after the move, notation.MoveRecord
+TurnChanged = namedtuple('TurnChanged', ['white_to_move'])
+GameOver = namedtuple('GameOver', ['status', 'message'])  # status is a game_status constant
+PositionLoaded = namedtuple('PositionLoaded', ['fen'])
+MoveTakenBack = namedtuple('MoveTakenBack', ['fen', 'record'])  # FEN after the undo, the undone record
+
+
+class GameEventBus(QObject):
+    move_made = pyqtSignal(object)
+    turn_changed = pyqtSignal(object)
+    game_over = pyqtSignal(object)
+    position_loaded = pyqtSignal(object)
+    move_taken_back = pyqtSignal(object)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.signals = {
+            MoveMade: self.move_made,
+            TurnChanged: self.turn_changed,
+            GameOver: self.game_over,
+            PositionLoaded: self.position_loaded,
+            MoveTakenBack: self.move_taken_back,
+        }
+
+    def publish(self, event):
+        # Slots of objects living in another thread receive the event through their event loop
+        self.signals[type(event)].emit(event)
+
+
+event_bus = GameEventBus()
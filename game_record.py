@@ -0,0 +1,151 @@
+# Compact binary game archive. A file is a sequence of game records, each made of
+#   header     magic, version, result, keyframe interval, ply count, start FEN length
+#   start FEN  utf-8, left empty for the standard starting position
+#   moves      one 16-bit Move.pack() per ply
+#   keyframes  the position after every keyframe_interval plies, 38 bytes each
+# GameArchive maps the file into memory and reaches any ply from the nearest keyframe, so
+# seeking replays at most keyframe_interval - 1 moves whatever the game length.
+import mmap
+import os
+import struct
+
+from fen import EMPTY, format_fen
+from position import Position, Move, STARTING_FEN, CASTLING_SYMBOLS
+from bitboards import WHITE, square_name
+
+MAGIC = b'CHGR'
+VERSION = 1
+KEYFRAME_INTERVAL = 64
+RESULTS = ['*', '1-0', '0-1', '1/2-1/2']  # Stored as the index
+
+HEADER = struct.Struct('<4sBBHIH')  # magic, version, result, keyframe interval, ply count, FEN length
+MOVE = struct.Struct('<H')
+# 32 bytes of board nibbles, turn (bit 0) and castling rights (bits 1-4), en passant square
+# (64 when there is none), halfmove clock, fullmove number
+KEYFRAME = struct.Struct('<32sBBHH')
+
+NIBBLE_LETTERS = EMPTY + 'PNBRQKpnbrqk'  # Board nibble -> FEN letter
+LETTER_NIBBLES = {letter: nibble for nibble, letter in enumerate(NIBBLE_LETTERS)}
+NO_EP = 64
+
+
+def encode_keyframe(pos):
+    nibbles = [LETTER_NIBBLES[letter] for letter in pos.board]
+    board = bytes(nibbles[sq] | nibbles[sq + 1] << 4 for sq in range(0, 64, 2))
+    flags = (0 if pos.turn == WHITE else 1) | pos.castling << 1
+    ep = NO_EP if pos.ep_square is None else pos.ep_square
+    return KEYFRAME.pack(board, flags, ep, pos.halfmove_clock, pos.fullmove_number)
+
+
+def decode_keyframe(data, offset=0):
+    # FEN of the keyframe at offset
+    board_bytes, flags, ep, halfmove_clock, fullmove_number = KEYFRAME.unpack_from(data, offset)
+    board = []
+    for byte in board_bytes:
+        board.append(NIBBLE_LETTERS[byte & 15])
+        board.append(NIBBLE_LETTERS[byte >> 4])
+    castling = ''.join(symbol for flag, symbol in CASTLING_SYMBOLS if flags >> 1 & flag) or '-'
+    return format_fen(board, 'b' if flags & 1 else 'w', castling,
+                      '-' if ep == NO_EP else square_name(ep), halfmove_clock, fullmove_number)
+
+
+def encode_game(start_fen, moves, result='*', keyframe_interval=KEYFRAME_INTERVAL):
+    # moves are position.Move, legal from start_fen
+    pos = Position(start_fen)
+    packed = bytearray()
+    keyframes = bytearray()
+    for ply, move in enumerate(moves, 1):
+        packed += MOVE.pack(move.pack())
+        pos.push(move)
+        if ply % keyframe_interval == 0:
+            keyframes += encode_keyframe(pos)
+    fen = b'' if start_fen == STARTING_FEN else start_fen.encode('utf-8')
+    header = HEADER.pack(MAGIC, VERSION, RESULTS.index(result), keyframe_interval, len(moves), len(fen))
+    return header + fen + packed + keyframes
+
+
+def append_game(file_name, start_fen, moves, result='*'):
+    with open(file_name, 'ab') as file:
+        file.write(encode_game(start_fen, moves, result))
+
+
+class GameView:
+    # One game of a GameArchive, read straight from the mapped file
+    def __init__(self, data, offset):
+        magic, version, result, interval, ply_count, fen_length = HEADER.unpack_from(data, offset)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"Not a game record at byte {offset}")
+        self.data = data
+        self.result = RESULTS[result]
+        self.keyframe_interval = interval
+        self.ply_count = ply_count
+        start = offset + HEADER.size
+        self.start_fen = bytes(data[start:start + fen_length]).decode('utf-8') or STARTING_FEN
+        self.moves_offset = start + fen_length
+        self.keyframes_offset = self.moves_offset + ply_count * MOVE.size
+        self.end = self.keyframes_offset + ply_count // interval * KEYFRAME.size
+
+    def __len__(self):
+        return self.ply_count
+
+    def move(self, ply):
+        # The move played at ply, counted from 1
+        if not 1 <= ply <= self.ply_count:
+            raise IndexError(f"No ply {ply} in a game of {self.ply_count}")
+        return Move.unpack(MOVE.unpack_from(self.data, self.moves_offset + (ply - 1) * MOVE.size)[0])
+
+    def moves(self, start=1, stop=None):
+        # Moves of plies start..stop (inclusive), in order
+        stop = self.ply_count if stop is None else stop
+        count = max(0, stop - start + 1)
+        packed = struct.unpack_from(f'<{count}H', self.data, self.moves_offset + (start - 1) * MOVE.size)
+        return [Move.unpack(value) for value in packed]
+
+    def fen_at(self, ply):
+        # FEN after ply moves; 0 is the start position
+        keyframe = ply // self.keyframe_interval
+        if keyframe == 0:
+            return self.start_fen
+        return decode_keyframe(self.data, self.keyframes_offset + (keyframe - 1) * KEYFRAME.size)
+
+    def position_at(self, ply):
+        if not 0 <= ply <= self.ply_count:
+            raise IndexError(f"No ply {ply} in a game of {self.ply_count}")
+        keyframe_ply = ply - ply % self.keyframe_interval
+        pos = Position(self.fen_at(keyframe_ply))
+        if ply > keyframe_ply:
+            for move in self.moves(keyframe_ply + 1, ply):
+                pos.push(move)
+        return pos
+
+
+class GameArchive:
+    # Memory-mapped archive written by append_game; archive[i] is the i-th game stored
+    def __init__(self, file_name):
+        self.file = open(file_name, 'rb')
+        size = os.fstat(self.file.fileno()).st_size
+        self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ) if size else b''
+        self.games = []
+        offset = 0
+        while offset < size:  # Only the headers are read
+            game = GameView(self.data, offset)
+            self.games.append(game)
+            offset = game.end
+
+    def __len__(self):
+        return len(self.games)
+
+    def __getitem__(self, index):
+        return self.games[index]
+
+    def close(self):
+        self.games = []
+        if isinstance(self.data, mmap.mmap):
+            self.data.close()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,91 @@
+# Game termination detection, evaluated once per move instead of on every status query.
+from collections import Counter
+
+from bitboards import WHITE, BLACK, PAWN, KNIGHT, BISHOP, ROOK, QUEEN
+from movegen import generate_legal_moves
+
+ONGOING = 0
+CHECKMATE = 1
+STALEMATE = 2
+FIFTY_MOVES = 3
+THREEFOLD_REPETITION = 4
+INSUFFICIENT_MATERIAL = 5
+TIME_OUT = 6  # Reported by the clock, never by GameStatus
+
+STATUS_MESSAGES = {
+    CHECKMATE: "Mat!",
+    STALEMATE: "Pat!",
+    FIFTY_MOVES: "Remis! Zasada 50 ruchów.",
+    THREEFOLD_REPETITION: "Remis! Trzykrotne powtórzenie pozycji.",
+    INSUFFICIENT_MATERIAL: "Remis! Niewystarczający materiał.",
+    TIME_OUT: "Koniec czasu!",
+}
+
+BB_LIGHT_SQUARES = 0x55AA_55AA_55AA_55AA
+
+
+def is_insufficient_material(pos):
+    white, black = pos.pieces[WHITE], pos.pieces[BLACK]
+    if white[PAWN] | black[PAWN] | white[ROOK] | black[ROOK] | white[QUEEN] | black[QUEEN]:
+        return False
+    knights = white[KNIGHT] | black[KNIGHT]
+    bishops = white[BISHOP] | black[BISHOP]
+    minors = knights | bishops
+    if not minors & (minors - 1):
+        return True  # Bare kings, or a single minor piece
+    # Any number of bishops all standing on squares of one colour cannot mate
+    return not knights and (not bishops & BB_LIGHT_SQUARES or not bishops & ~BB_LIGHT_SQUARES)
+
+
+class GameStatus:
+    def __init__(self, cache_size=4096):
+        self.cache_size = cache_size
+        self._cache = {}  # position key -> status that depends on the position alone
+        self.clear()
+
+    def clear(self):
+        self.history = []
+        self.repetitions = Counter()
+        self.current = ONGOING
+
+    def record(self, pos):
+        # Call once after every move (or loaded position); returns the status of the new position
+        key = pos.key()
+        self.history.append(key)
+        self.repetitions[key] += 1
+        self.current = self.evaluate(pos, key)
+        return self.current
+
+    def undo(self):
+        key = self.history.pop()
+        self.repetitions[key] -= 1
+        if not self.repetitions[key]:
+            del self.repetitions[key]
+        self.current = ONGOING
+
+    def evaluate(self, pos, key=None):
+        if key is None:
+            key = pos.key()
+        status = self._cache.get(key)
+        if status is None:
+            if len(self._cache) >= self.cache_size:
+                self._cache.clear()
+            status = self._position_status(pos)
+            self._cache[key] = status
+        if status != ONGOING:
+            return status
+        if self.repetitions[key] >= 3:
+            return THREEFOLD_REPETITION
+        if pos.halfmove_clock >= 100:
+            return FIFTY_MOVES
+        return ONGOING
+
+    def _position_status(self, pos):
+        if not generate_legal_moves(pos):
+            return CHECKMATE if pos.is_check() else STALEMATE
+        if is_insufficient_material(pos):
+            return INSUFFICIENT_MATERIAL
+        return ONGOING
+
+    def is_game_over(self):
+        return self.current != ONGOING
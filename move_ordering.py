@@ -0,0 +1,67 @@
+# Move ordering for the alpha-beta search: hash move, MVV-LVA captures, killers, history.
+from bitboards import BB_SQUARES, PAWN
+
+MAX_PLY = 128
+
+# Victim and attacker weights for MVV-LVA, indexed by piece type (king last)
+ORDER_VALUES = [1, 3, 3, 5, 9, 20]
+
+HASH_MOVE_SCORE = 1 << 30
+CAPTURE_SCORE = 1 << 28
+KILLER_SCORES = (1 << 27, (1 << 27) - 1)
+HISTORY_LIMIT = 1 << 26  # Quiet moves stay below the killers
+
+
+class MoveOrderer:
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        self.killers = [[None, None] for ply in range(MAX_PLY)]
+        self.history = [[0] * 4096 for color in range(2)]  # history[color][from * 64 + to]
+
+    def new_search(self):
+        # Keep what was learnt, but let the next search outweigh it
+        for table in self.history:
+            for index, value in enumerate(table):
+                if value:
+                    table[index] = value >> 1
+        self.killers = [[None, None] for ply in range(MAX_PLY)]
+
+    def is_capture(self, pos, move):
+        return bool(pos.occupied_co[pos.turn ^ 1] & BB_SQUARES[move.to_square]) or (
+            move.to_square == pos.ep_square and pos.pieces[pos.turn][PAWN] & BB_SQUARES[move.from_square])
+
+    def score(self, pos, move, ply, hash_move):
+        if move == hash_move:
+            return HASH_MOVE_SCORE
+        if self.is_capture(pos, move):
+            victim = pos.piece_type_at(move.to_square)
+            victim = PAWN if victim is None else victim  # En passant
+            attacker = pos.piece_type_at(move.from_square)
+            return CAPTURE_SCORE + 32 * ORDER_VALUES[victim] - ORDER_VALUES[attacker]
+        if move.promotion is not None:
+            return CAPTURE_SCORE + 32 * ORDER_VALUES[move.promotion] - ORDER_VALUES[PAWN]
+        killers = self.killers[ply] if ply < MAX_PLY else (None, None)
+        if move == killers[0]:
+            return KILLER_SCORES[0]
+        if move == killers[1]:
+            return KILLER_SCORES[1]
+        return self.history[pos.turn][move.from_square * 64 + move.to_square]
+
+    def order(self, pos, moves, ply, hash_move=None):
+        moves.sort(key=lambda move: self.score(pos, move, ply, hash_move), reverse=True)
+        return moves
+
+    def record_cutoff(self, pos, move, ply, depth):
+        # Only quiet moves feed the killer and history tables, captures are ordered by MVV-LVA
+        if self.is_capture(pos, move) or move.promotion is not None:
+            return
+        if ply < MAX_PLY:
+            killers = self.killers[ply]
+            if killers[0] != move:
+                killers[1] = killers[0]
+                killers[0] = move
+        table = self.history[pos.turn]
+        index = move.from_square * 64 + move.to_square
+        table[index] = min(HISTORY_LIMIT, table[index] + depth * depth)
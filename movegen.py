@@ -0,0 +1,97 @@
+# Move generation on top of the precomputed attack tables in bitboards.py.
+from bitboards import (
+    WHITE, PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING,
+    BB_ALL, BB_SQUARES, E1, E8,
+    KNIGHT_ATTACKS, KING_ATTACKS, PAWN_ATTACKS, rook_attacks, bishop_attacks, iter_squares,
+)
+from position import Move
+
+PROMOTIONS = (QUEEN, ROOK, BISHOP, KNIGHT)
+
+
+def _add_pawn_moves(moves, from_sq, targets, last_rank):
+    for to_sq in iter_squares(targets):
+        if to_sq >> 3 == last_rank:
+            for promotion in PROMOTIONS:
+                moves.append(Move(from_sq, to_sq, promotion))
+        else:
+            moves.append(Move(from_sq, to_sq))
+
+
+def generate_pseudo_legal_moves(pos, from_mask=BB_ALL):
+    # Every move obeying piece movement rules for the side to move, own king safety aside.
+    # Castling is only generated when the king does not start, pass or land on an attacked square.
+    moves = []
+    us = pos.turn
+    pieces = pos.pieces[us]
+    occupied = pos.occupied
+    not_own = ~pos.occupied_co[us] & BB_ALL
+    enemy = pos.occupied_co[us ^ 1]
+
+    for from_sq in iter_squares(pieces[KNIGHT] & from_mask):
+        for to_sq in iter_squares(KNIGHT_ATTACKS[from_sq] & not_own):
+            moves.append(Move(from_sq, to_sq))
+    for from_sq in iter_squares((pieces[BISHOP] | pieces[QUEEN]) & from_mask):
+        for to_sq in iter_squares(bishop_attacks(from_sq, occupied) & not_own):
+            moves.append(Move(from_sq, to_sq))
+    for from_sq in iter_squares((pieces[ROOK] | pieces[QUEEN]) & from_mask):
+        for to_sq in iter_squares(rook_attacks(from_sq, occupied) & not_own):
+            moves.append(Move(from_sq, to_sq))
+    for from_sq in iter_squares(pieces[KING] & from_mask):
+        for to_sq in iter_squares(KING_ATTACKS[from_sq] & not_own):
+            moves.append(Move(from_sq, to_sq))
+        if from_sq == (E1 if us == WHITE else E8) and pos.castling:
+            for to_sq in (from_sq + 2, from_sq - 2):
+                if pos.can_castle(from_sq, to_sq):
+                    moves.append(Move(from_sq, to_sq))
+
+    capturable = enemy
+    if pos.ep_square is not None:
+        capturable |= BB_SQUARES[pos.ep_square]
+    forward, start_rank, last_rank = (8, 1, 7) if us == WHITE else (-8, 6, 0)
+    for from_sq in iter_squares(pieces[PAWN] & from_mask):
+        _add_pawn_moves(moves, from_sq, PAWN_ATTACKS[us][from_sq] & capturable, last_rank)
+        to_sq = from_sq + forward
+        if not occupied & BB_SQUARES[to_sq]:
+            _add_pawn_moves(moves, from_sq, BB_SQUARES[to_sq], last_rank)
+            if from_sq >> 3 == start_rank and not occupied & BB_SQUARES[to_sq + forward]:
+                moves.append(Move(from_sq, to_sq + forward))
+    return moves
+
+
+def generate_legal_moves(pos, from_mask=BB_ALL):
+    # Pins and checkers are computed once, after that each move is accepted or rejected in O(1)
+    return [move for move in generate_pseudo_legal_moves(pos, from_mask) if not pos.is_into_check(move)]
+
+
+def generate_legal_captures(pos):
+    # Captures (en passant included) and queen promotions, for the quiescence search
+    us = pos.turn
+    pieces = pos.pieces[us]
+    occupied = pos.occupied
+    enemy = pos.occupied_co[us ^ 1]
+    moves = []
+    for from_sq in iter_squares(pieces[KNIGHT]):
+        for to_sq in iter_squares(KNIGHT_ATTACKS[from_sq] & enemy):
+            moves.append(Move(from_sq, to_sq))
+    for from_sq in iter_squares(pieces[BISHOP] | pieces[QUEEN]):
+        for to_sq in iter_squares(bishop_attacks(from_sq, occupied) & enemy):
+            moves.append(Move(from_sq, to_sq))
+    for from_sq in iter_squares(pieces[ROOK] | pieces[QUEEN]):
+        for to_sq in iter_squares(rook_attacks(from_sq, occupied) & enemy):
+            moves.append(Move(from_sq, to_sq))
+    for from_sq in iter_squares(pieces[KING]):
+        for to_sq in iter_squares(KING_ATTACKS[from_sq] & enemy):
+            moves.append(Move(from_sq, to_sq))
+
+    capturable = enemy
+    if pos.ep_square is not None:
+        capturable |= BB_SQUARES[pos.ep_square]
+    forward, last_rank = (8, 7) if us == WHITE else (-8, 0)
+    for from_sq in iter_squares(pieces[PAWN]):
+        for to_sq in iter_squares(PAWN_ATTACKS[us][from_sq] & capturable):
+            moves.append(Move(from_sq, to_sq, QUEEN if to_sq >> 3 == last_rank else None))
+        to_sq = from_sq + forward
+        if to_sq >> 3 == last_rank and not occupied & BB_SQUARES[to_sq]:
+            moves.append(Move(from_sq, to_sq, QUEEN))
+    return [move for move in moves if not pos.is_into_check(move)]
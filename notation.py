@@ -0,0 +1,54 @@
+# Move records and standard algebraic notation (SAN), built while the move is made.
+from collections import namedtuple
+
+from bitboards import PAWN, BB_SQUARES, square_file, square_rank, square_name
+from movegen import generate_legal_moves
+
+SAN_PIECES = ' NBRQK'  # Indexed by piece type, pawns have no letter
+
+# piece and captured are piece types, captured is None for a quiet move; zobrist is the key
+# of the position after the move
+MoveRecord = namedtuple('MoveRecord', ['from_square', 'to_square', 'promotion', 'piece', 'captured', 'uci', 'san',
+                                       'zobrist'])
+
+
+def san_without_suffix(pos, move):
+    # SAN of a legal move in pos, before the check or mate mark
+    if pos.is_castling(move):
+        return 'O-O' if move.to_square > move.from_square else 'O-O-O'
+    piece = pos.piece_type_at(move.from_square)
+    capture = bool(pos.occupied & BB_SQUARES[move.to_square]) or (piece == PAWN and move.to_square == pos.ep_square)
+    if piece == PAWN:
+        san = square_name(move.from_square)[0] + 'x' if capture else ''
+    else:
+        san = SAN_PIECES[piece]
+        # Name the file, the rank or both when another piece of the same kind can go there too
+        rivals = [other.from_square for other in generate_legal_moves(pos, pos.pieces[pos.turn][piece])
+                  if other.to_square == move.to_square and other.from_square != move.from_square]
+        if rivals:
+            if all(square_file(sq) != square_file(move.from_square) for sq in rivals):
+                san += square_name(move.from_square)[0]
+            elif all(square_rank(sq) != square_rank(move.from_square) for sq in rivals):
+                san += square_name(move.from_square)[1]
+            else:
+                san += square_name(move.from_square)
+        if capture:
+            san += 'x'
+    san += square_name(move.to_square)
+    if move.promotion is not None:
+        san += '=' + SAN_PIECES[move.promotion]
+    return san
+
+
+def push_move(pos, move):
+    # Make a legal move on pos and return its MoveRecord
+    piece = pos.piece_type_at(move.from_square)
+    captured = pos.piece_type_at(move.to_square)
+    if captured is None and piece == PAWN and move.to_square == pos.ep_square:
+        captured = PAWN
+    san = san_without_suffix(pos, move)
+    pos.push(move)
+    if pos.is_check():
+        san += '+' if generate_legal_moves(pos) else '#'
+    return MoveRecord(move.from_square, move.to_square, move.promotion, piece, captured, move.uci(), san,
+                      pos.key())
@@ -0,0 +1,394 @@
+# Qt-free chess position built on 64-bit bitboards.
+from collections import namedtuple
+
+from bitboards import (
+    WHITE, BLACK, PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING, PIECE_SYMBOLS,
+    BB_SQUARES, BB_BETWEEN, E1, E8, A1, H1, A8, H8,
+    KNIGHT_ATTACKS, KING_ATTACKS, PAWN_ATTACKS, rook_attacks, bishop_attacks,
+    square_file, square_rank, square_name, parse_square, iter_squares,
+)
+from zobrist import PIECE_KEYS, BLACK_TO_MOVE_KEY, CASTLING_KEYS, EP_FILE_KEYS
+from evaluation import MG_SIGNED, EG_SIGNED, PHASE_WEIGHTS
+from fen import EMPTY, parse_fen, format_fen
+
+CASTLE_WK = 1
+CASTLE_WQ = 2
+CASTLE_BK = 4
+CASTLE_BQ = 8
+CASTLING_SYMBOLS = [(CASTLE_WK, 'K'), (CASTLE_WQ, 'Q'), (CASTLE_BK, 'k'), (CASTLE_BQ, 'q')]
+
+# FEN letter of each piece, PIECE_LETTERS[color][piece_type], and the way back
+PIECE_LETTERS = [[symbol.upper() for symbol in PIECE_SYMBOLS], list(PIECE_SYMBOLS)]
+LETTER_PIECES = {PIECE_LETTERS[color][piece_type]: (color, piece_type)
+                 for color in (WHITE, BLACK) for piece_type in range(6)}
+PIECE_TYPES = {letter: piece[1] for letter, piece in LETTER_PIECES.items()}
+PIECE_TYPES[EMPTY] = None
+
+STARTING_FEN = 'rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1'
+
+# Castling rights that survive a move touching the given square
+CASTLING_KEEP = [0xF] * 64
+CASTLING_KEEP[E1] &= ~(CASTLE_WK | CASTLE_WQ)
+CASTLING_KEEP[H1] &= ~CASTLE_WK
+CASTLING_KEEP[A1] &= ~CASTLE_WQ
+CASTLING_KEEP[E8] &= ~(CASTLE_BK | CASTLE_BQ)
+CASTLING_KEEP[H8] &= ~CASTLE_BK
+CASTLING_KEEP[A8] &= ~CASTLE_BQ
+
+
+class Move(namedtuple('Move', ['from_square', 'to_square', 'promotion'])):
+    __slots__ = ()
+
+    def __new__(cls, from_square, to_square, promotion=None):
+        return super().__new__(cls, from_square, to_square, promotion)
+
+    def uci(self):
+        promotion = PIECE_SYMBOLS[self.promotion] if self.promotion is not None else ''
+        return square_name(self.from_square) + square_name(self.to_square) + promotion
+
+    @classmethod
+    def from_uci(cls, uci):
+        promotion = PIECE_SYMBOLS.index(uci[4]) if len(uci) > 4 else None
+        return cls(parse_square(uci[0:2]), parse_square(uci[2:4]), promotion)
+
+    def pack(self):
+        # 16-bit form: from (6 bits) | to (6 bits) | promotion + 1 (3 bits, 0 when there is none)
+        promotion = 0 if self.promotion is None else self.promotion + 1
+        return self.from_square | self.to_square << 6 | promotion << 12
+
+    @classmethod
+    def unpack(cls, packed):
+        promotion = packed >> 12 & 7
+        return cls(packed & 63, packed >> 6 & 63, promotion - 1 if promotion else None)
+
+
+class Position:
+    def __init__(self, fen=STARTING_FEN):
+        self.set_fen(fen)
+
+    def clear(self):
+        self.pieces = [[0] * 6, [0] * 6]  # pieces[color][piece_type] -> bitboard
+        self.occupied_co = [0, 0]
+        self.occupied = 0
+        self.board = [EMPTY] * 64  # Mailbox of FEN letters, kept in step with the bitboards
+        self.turn = WHITE
+        self.castling = 0
+        self.ep_square = None
+        self.halfmove_clock = 0
+        self.fullmove_number = 1
+        self.zobrist = 0  # Updated incrementally by every change below
+        self.mg_score = 0  # Running evaluation totals, see evaluation.py
+        self.eg_score = 0
+        self.phase = 0
+        self._stack = []
+        self._pins = None
+
+    def set_fen(self, fen):
+        self.clear()
+        fields = parse_fen(fen)
+        for sq, letter in enumerate(fields.board):
+            if letter != EMPTY:
+                self._put(sq, *LETTER_PIECES[letter])
+        self.turn = WHITE if fields.turn == 'w' else BLACK
+        for flag, symbol in CASTLING_SYMBOLS:
+            if symbol in fields.castling:
+                self.castling |= flag
+        if fields.ep != '-':
+            self.ep_square = parse_square(fields.ep)
+        self.halfmove_clock = fields.halfmove_clock
+        self.fullmove_number = fields.fullmove_number
+        self.zobrist ^= self._state_key()
+
+    def fen(self):
+        castling = ''.join(symbol for flag, symbol in CASTLING_SYMBOLS if self.castling & flag) or '-'
+        ep = square_name(self.ep_square) if self.ep_square is not None else '-'
+        return format_fen(self.board, 'w' if self.turn == WHITE else 'b', castling, ep,
+                          self.halfmove_clock, self.fullmove_number)
+
+    def key(self):
+        # Identifies the position: placement, side to move, castling and en passant
+        return self.zobrist
+
+    def _state_key(self):
+        # Zobrist part that is not piece placement. It reads the pawns too, so push and pop
+        # take it out before changing anything and put it back once everything has changed.
+        key = CASTLING_KEYS[self.castling]
+        if self.turn == BLACK:
+            key ^= BLACK_TO_MOVE_KEY
+        # The en passant file only counts when a pawn of the side to move can capture there;
+        # otherwise the position is the same one, for repetitions too, as without it
+        if self.ep_square is not None and \
+                PAWN_ATTACKS[self.turn ^ 1][self.ep_square] & self.pieces[self.turn][PAWN]:
+            key ^= EP_FILE_KEYS[self.ep_square & 7]
+        return key
+
+    def copy(self):
+        other = Position.__new__(Position)
+        other.pieces = [self.pieces[WHITE][:], self.pieces[BLACK][:]]
+        other.occupied_co = self.occupied_co[:]
+        other.occupied = self.occupied
+        other.board = self.board[:]
+        other.turn = self.turn
+        other.castling = self.castling
+        other.ep_square = self.ep_square
+        other.halfmove_clock = self.halfmove_clock
+        other.fullmove_number = self.fullmove_number
+        other.zobrist = self.zobrist
+        other.mg_score = self.mg_score
+        other.eg_score = self.eg_score
+        other.phase = self.phase
+        other._stack = []
+        other._pins = None
+        return other
+
+    def _put(self, sq, color, piece_type):
+        bb = BB_SQUARES[sq]
+        self.pieces[color][piece_type] |= bb
+        self.occupied_co[color] |= bb
+        self.occupied |= bb
+        self.board[sq] = PIECE_LETTERS[color][piece_type]
+        self.zobrist ^= PIECE_KEYS[color][piece_type][sq]
+        self.mg_score += MG_SIGNED[color][piece_type][sq]
+        self.eg_score += EG_SIGNED[color][piece_type][sq]
+        self.phase += PHASE_WEIGHTS[piece_type]
+
+    def _remove(self, sq, color, piece_type):
+        bb = ~BB_SQUARES[sq]
+        self.pieces[color][piece_type] &= bb
+        self.occupied_co[color] &= bb
+        self.occupied &= bb
+        self.board[sq] = EMPTY
+        self.zobrist ^= PIECE_KEYS[color][piece_type][sq]
+        self.mg_score -= MG_SIGNED[color][piece_type][sq]
+        self.eg_score -= EG_SIGNED[color][piece_type][sq]
+        self.phase -= PHASE_WEIGHTS[piece_type]
+
+    def color_at(self, sq):
+        bb = BB_SQUARES[sq]
+        if self.occupied_co[WHITE] & bb:
+            return WHITE
+        if self.occupied_co[BLACK] & bb:
+            return BLACK
+        return None
+
+    def piece_type_at(self, sq):
+        return PIECE_TYPES[self.board[sq]]
+
+    def piece_at(self, sq):
+        return LETTER_PIECES.get(self.board[sq])
+
+    def king_square(self, color):
+        king = self.pieces[color][KING]
+        return king.bit_length() - 1 if king else None
+
+    def attackers_mask(self, color, sq, occupied=None):
+        # Every piece of the given colour that attacks sq, as a bitboard
+        if occupied is None:
+            occupied = self.occupied
+        pieces = self.pieces[color]
+        queens = pieces[QUEEN]
+        return ((KNIGHT_ATTACKS[sq] & pieces[KNIGHT]) |
+                (KING_ATTACKS[sq] & pieces[KING]) |
+                (PAWN_ATTACKS[color ^ 1][sq] & pieces[PAWN]) |
+                (rook_attacks(sq, occupied) & (pieces[ROOK] | queens)) |
+                (bishop_attacks(sq, occupied) & (pieces[BISHOP] | queens)))
+
+    def is_attacked(self, sq, by_color):
+        return bool(self.attackers_mask(by_color, sq))
+
+    def is_check(self):
+        return bool(self.pin_info()[1])
+
+    def is_castling(self, move):
+        return (self.pieces[self.turn][KING] & BB_SQUARES[move.from_square]
+                and abs(move.to_square - move.from_square) == 2)
+
+    def can_castle(self, from_sq, to_sq):
+        us = self.turn
+        them = us ^ 1
+        if from_sq != (E1 if us == WHITE else E8):
+            return False
+        if to_sq == from_sq + 2:
+            flag, rook_sq = (CASTLE_WK, H1) if us == WHITE else (CASTLE_BK, H8)
+        else:
+            flag, rook_sq = (CASTLE_WQ, A1) if us == WHITE else (CASTLE_BQ, A8)
+        if not self.castling & flag or not self.pieces[us][ROOK] & BB_SQUARES[rook_sq]:
+            return False
+        if BB_BETWEEN[from_sq][rook_sq] & self.occupied:
+            return False
+        step = 1 if to_sq > from_sq else -1
+        for sq in (from_sq, from_sq + step, to_sq):
+            if self.is_attacked(sq, them):
+                return False
+        return True
+
+    def is_pseudo_legal(self, move):
+        # Piece movement rules for the side to move, ignoring the safety of its own king
+        from_sq, to_sq = move.from_square, move.to_square
+        us = self.turn
+        from_bb, to_bb = BB_SQUARES[from_sq], BB_SQUARES[to_sq]
+        if not self.occupied_co[us] & from_bb or self.occupied_co[us] & to_bb:
+            return False
+        piece_type = self.piece_type_at(from_sq)
+        df = square_file(to_sq) - square_file(from_sq)
+        dr = square_rank(to_sq) - square_rank(from_sq)
+
+        if piece_type == PAWN:
+            last_rank = 7 if us == WHITE else 0
+            if square_rank(to_sq) == last_rank:
+                if move.promotion not in (KNIGHT, BISHOP, ROOK, QUEEN):
+                    return False
+            elif move.promotion is not None:
+                return False
+            forward = 1 if us == WHITE else -1
+            if df == 0:
+                if self.occupied & to_bb:
+                    return False
+                if dr == forward:
+                    return True
+                start_rank = 1 if us == WHITE else 6
+                return (dr == 2 * forward and square_rank(from_sq) == start_rank
+                        and not BB_BETWEEN[from_sq][to_sq] & self.occupied)
+            if abs(df) == 1 and dr == forward:
+                return bool(self.occupied_co[us ^ 1] & to_bb) or to_sq == self.ep_square
+            return False
+
+        if move.promotion is not None:
+            return False
+        if piece_type == KNIGHT:
+            return abs(df) + abs(dr) == 3 and df != 0 and dr != 0
+        if piece_type == KING:
+            if abs(df) <= 1 and abs(dr) <= 1:
+                return True
+            return dr == 0 and abs(df) == 2 and self.can_castle(from_sq, to_sq)
+        diagonal = df != 0 and abs(df) == abs(dr)
+        straight = (df == 0) != (dr == 0)
+        if piece_type == BISHOP and not diagonal:
+            return False
+        if piece_type == ROOK and not straight:
+            return False
+        if piece_type == QUEEN and not (diagonal or straight):
+            return False
+        return not BB_BETWEEN[from_sq][to_sq] & self.occupied
+
+    def pin_info(self):
+        # King square, checkers, pinned pieces and the line each pinned piece may still move on.
+        # Computed once per position and dropped on push/pop.
+        if self._pins is not None:
+            return self._pins
+        us = self.turn
+        them = us ^ 1
+        king = self.king_square(us)
+        checkers = 0
+        pinned = 0
+        pin_lines = {}
+        if king is not None:
+            checkers = self.attackers_mask(them, king)
+            enemy = self.pieces[them]
+            snipers = ((rook_attacks(king, 0) & (enemy[ROOK] | enemy[QUEEN])) |
+                       (bishop_attacks(king, 0) & (enemy[BISHOP] | enemy[QUEEN])))
+            for sniper in iter_squares(snipers):
+                blockers = BB_BETWEEN[king][sniper] & self.occupied
+                if blockers and not blockers & (blockers - 1) and blockers & self.occupied_co[us]:
+                    pinned |= blockers
+                    pin_lines[blockers.bit_length() - 1] = BB_BETWEEN[king][sniper] | BB_SQUARES[sniper]
+        self._pins = (king, checkers, pinned, pin_lines)
+        return self._pins
+
+    def is_into_check(self, move):
+        # Whether a pseudo-legal move leaves the own king attacked, answered from the
+        # checkers and pins of the position without playing the move
+        king, checkers, pinned, pin_lines = self.pin_info()
+        if king is None:
+            return False
+        from_sq, to_sq = move.from_square, move.to_square
+        them = self.turn ^ 1
+        if from_sq == king:
+            if abs(to_sq - from_sq) == 2:
+                return False  # can_castle already refused attacked squares
+            return bool(self.attackers_mask(them, to_sq, self.occupied ^ BB_SQUARES[king]))
+        if to_sq == self.ep_square and self.pieces[self.turn][PAWN] & BB_SQUARES[from_sq]:
+            # Removing two pawns from one rank can expose the king, so look at the result directly
+            captured = to_sq - 8 if self.turn == WHITE else to_sq + 8
+            occupied = (self.occupied ^ BB_SQUARES[from_sq] ^ BB_SQUARES[captured]) | BB_SQUARES[to_sq]
+            return bool(self.attackers_mask(them, king, occupied) & ~BB_SQUARES[captured])
+        if checkers:
+            if checkers & (checkers - 1):
+                return True  # Double check, only the king can move
+            checker = checkers.bit_length() - 1
+            if not (BB_BETWEEN[king][checker] | checkers) & BB_SQUARES[to_sq]:
+                return True
+        if pinned & BB_SQUARES[from_sq]:
+            return not pin_lines[from_sq] & BB_SQUARES[to_sq]
+        return False
+
+    def is_legal(self, move):
+        return self.is_pseudo_legal(move) and not self.is_into_check(move)
+
+    def push(self, move):
+        us = self.turn
+        them = us ^ 1
+        from_sq, to_sq = move.from_square, move.to_square
+        piece_type = self.piece_type_at(from_sq)
+        captured = self.piece_type_at(to_sq)
+        ep_capture = piece_type == PAWN and to_sq == self.ep_square and captured is None
+        self._stack.append((move, piece_type, captured, ep_capture,
+                            self.castling, self.ep_square, self.halfmove_clock))
+        self._pins = None
+        self.zobrist ^= self._state_key()
+
+        self.ep_square = None
+        self.halfmove_clock += 1
+        if captured is not None:
+            self._remove(to_sq, them, captured)
+            self.halfmove_clock = 0
+        self._remove(from_sq, us, piece_type)
+
+        placed = piece_type
+        if piece_type == PAWN:
+            self.halfmove_clock = 0
+            if ep_capture:
+                self._remove(to_sq - 8 if us == WHITE else to_sq + 8, them, PAWN)
+            elif abs(to_sq - from_sq) == 16:
+                self.ep_square = (from_sq + to_sq) // 2
+            if move.promotion is not None:
+                placed = move.promotion
+        elif piece_type == KING and abs(to_sq - from_sq) == 2:
+            rook_from, rook_to = (from_sq + 3, from_sq + 1) if to_sq > from_sq else (from_sq - 4, from_sq - 1)
+            self._remove(rook_from, us, ROOK)
+            self._put(rook_to, us, ROOK)
+        self._put(to_sq, us, placed)
+
+        self.castling &= CASTLING_KEEP[from_sq] & CASTLING_KEEP[to_sq]
+        if us == BLACK:
+            self.fullmove_number += 1
+        self.turn = them
+        self.zobrist ^= self._state_key()
+
+    def pop(self):
+        move, piece_type, captured, ep_capture, castling, ep_square, halfmove_clock = self._stack.pop()
+        self._pins = None
+        self.zobrist ^= self._state_key()
+        self.turn ^= 1
+        us = self.turn
+        them = us ^ 1
+        from_sq, to_sq = move.from_square, move.to_square
+        if us == BLACK:
+            self.fullmove_number -= 1
+
+        self._remove(to_sq, us, move.promotion if move.promotion is not None else piece_type)
+        self._put(from_sq, us, piece_type)
+        if ep_capture:
+            self._put(to_sq - 8 if us == WHITE else to_sq + 8, them, PAWN)
+        elif captured is not None:
+            self._put(to_sq, them, captured)
+        if piece_type == KING and abs(to_sq - from_sq) == 2:
+            rook_from, rook_to = (from_sq + 3, from_sq + 1) if to_sq > from_sq else (from_sq - 4, from_sq - 1)
+            self._remove(rook_to, us, ROOK)
+            self._put(rook_from, us, ROOK)
+
+        self.castling = castling
+        self.ep_square = ep_square
+        self.halfmove_clock = halfmove_clock
+        self.zobrist ^= self._state_key()
+        return move
@@ -0,0 +1,34 @@
+# Process-wide cache of piece sprites: each image is decoded from the items_rc resources
+# once and the same QPixmap is shared by every piece item that shows it.
+from PyQt5.QtCore import Qt
+from PyQt5.QtGui import QGuiApplication, QPixmap
+
+import items_rc
+
+SQUARE_SIZE = 60
+_pixmaps = {}
+
+
+def device_pixel_ratio():
+    app = QGuiApplication.instance()
+    return app.devicePixelRatio() if app is not None else 1.0
+
+
+def piece_pixmap(color, piece, size=SQUARE_SIZE):
+    # color 'white'/'black', piece 'pawn', 'rook', ...; size is the square size in logical pixels.
+    # On HiDPI screens the sprite is pre-scaled to device pixels, so painting never rescales it.
+    ratio = device_pixel_ratio()
+    key = (color, piece, size, ratio)
+    pixmap = _pixmaps.get(key)
+    if pixmap is None:
+        pixmap = QPixmap(f':/images/{color}_{piece}.png')
+        pixels = int(round(size * ratio))
+        if pixmap.width() != pixels or pixmap.height() != pixels:
+            pixmap = pixmap.scaled(pixels, pixels, Qt.KeepAspectRatio, Qt.SmoothTransformation)
+        pixmap.setDevicePixelRatio(ratio)
+        _pixmaps[key] = pixmap
+    return pixmap
+
+
+def clear_sprite_cache():
+    _pixmaps.clear()
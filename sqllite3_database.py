@@ -1,36 +1,162 @@
+import queue
 import sqlite3
+import threading
+
+from position import Position
+
+BATCH_SIZE = 256  # Most queued writes one background commit takes
+
+
+def to_signed(key):
+    # SQLite integers are signed 64-bit, Zobrist keys are unsigned
+    return key - (1 << 64) if key >= 1 << 63 else key
+
+
+def position_fen(fen):
+    # positions are keyed on placement, side to move, castling and en passant; the move
+    # counters would give the same position a new row at every move number
+    return ' '.join(fen.split()[:4])
+
+
+def create_fen_strings(conn):
+    # Version 1: the original single table of FEN strings
+    conn.execute('''CREATE TABLE IF NOT EXISTS fen_strings
+                    (id INTEGER PRIMARY KEY, fen_string TEXT)''')
+
+
+def create_games_and_moves(conn):
+    # Version 2: games, their moves and the positions they reach, stored once each
+    conn.execute('''CREATE TABLE games (id INTEGER PRIMARY KEY, start_fen TEXT NOT NULL, result TEXT,
+                                        started_at TEXT DEFAULT CURRENT_TIMESTAMP)''')
+    conn.execute('CREATE TABLE positions (id INTEGER PRIMARY KEY, fen TEXT NOT NULL UNIQUE)')
+    conn.execute('''CREATE TABLE moves (id INTEGER PRIMARY KEY,
+                                        game_id INTEGER NOT NULL REFERENCES games(id) ON DELETE CASCADE,
+                                        ply INTEGER NOT NULL, uci TEXT, san TEXT, zobrist INTEGER NOT NULL,
+                                        clock_ms INTEGER,
+                                        position_id INTEGER NOT NULL REFERENCES positions(id))''')
+    conn.execute('CREATE UNIQUE INDEX moves_game_ply ON moves (game_id, ply)')  # Replay and undo
+    conn.execute('CREATE INDEX moves_zobrist ON moves (zobrist, game_id)')  # Games through a position
+    conn.execute('CREATE INDEX moves_position ON moves (position_id)')
+    # FENs of the old table become the moves of one game, without move notation
+    rows = conn.execute('SELECT fen_string FROM fen_strings ORDER BY id').fetchall()
+    if rows:
+        game_id = conn.execute('INSERT INTO games (start_fen) VALUES (?)', (rows[0][0],)).lastrowid
+        for ply, (fen_string,) in enumerate(rows, 1):
+            conn.execute('INSERT OR IGNORE INTO positions (fen) VALUES (?)', (position_fen(fen_string),))
+            conn.execute('''INSERT INTO moves (game_id, ply, zobrist, position_id)
+                            VALUES (?, ?, ?, (SELECT id FROM positions WHERE fen = ?))''',
+                         (game_id, ply, to_signed(Position(fen_string).key()), position_fen(fen_string)))
+    conn.execute('DROP TABLE fen_strings')
+
+
+# MIGRATIONS[n] upgrades a database from PRAGMA user_version n to n + 1
+MIGRATIONS = [create_fen_strings, create_games_and_moves]
+
 
 class FenDatabase:
+    # One connection for the whole session. Writes are queued and a background thread
+    # commits them in groups, so a move never waits for the disk. WAL with synchronous=NORMAL
+    # only syncs on checkpoints; a crash can lose the last moves but never corrupts the file.
     def __init__(self, db_file):
-        self.conn = sqlite3.connect(db_file)
-        self.create_table()
-
-    def create_table(self):
-        cursor = self.conn.cursor()
-        cursor.execute('''CREATE TABLE IF NOT EXISTS fen_strings
-                          (id INTEGER PRIMARY KEY, fen_string TEXT)''')
-        self.conn.commit()
-
-    def get_last_fen_string(self):
-        cursor = self.conn.cursor()
-        cursor.execute('SELECT fen_string FROM fen_strings ORDER BY id DESC LIMIT 1')
-        result = cursor.fetchone()
-        if result:
-            return result[0]
-        return None
+        self.conn = sqlite3.connect(db_file, check_same_thread=False)
+        self.lock = threading.Lock()  # Serializes the writer thread and the reading threads
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.execute('PRAGMA foreign_keys=ON')
+        self.migrate()
+        self.pending = queue.Queue()
+        self.writer = threading.Thread(target=self.write_pending, daemon=True)
+        self.writer.start()
+
+    def migrate(self):
+        with self.lock:
+            version = self.conn.execute('PRAGMA user_version').fetchone()[0]
+            for upgrade in MIGRATIONS[version:]:
+                self.conn.execute('BEGIN')  # Schema changes too, so a failed step leaves no trace
+                with self.conn:  # Each step commits, or rolls back on error
+                    upgrade(self.conn)
+                    version += 1
+                    self.conn.execute(f'PRAGMA user_version = {version}')
+
+    def write_pending(self):
+        while True:
+            batch = [self.pending.get()]
+            while len(batch) < BATCH_SIZE:
+                try:
+                    batch.append(self.pending.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                with self.lock:
+                    for statements in batch:
+                        for sql, params in statements or ():
+                            self.conn.execute(sql, params)
+                    self.conn.commit()
+            except sqlite3.Error as error:
+                self.conn.rollback()
+                print(f"Move history write failed: {error}")
+            finally:
+                for _ in batch:
+                    self.pending.task_done()
+            if None in batch:  # Queued by close()
+                return
+
+    def write(self, *statements):
+        # Queue (sql, params) pairs, committed together in order by the writer thread
+        self.pending.put(statements)
+
+    def flush(self):
+        # Wait until every queued write is committed
+        self.pending.join()
+
+    def start_game(self, start_fen):
+        self.flush()
+        with self.lock:
+            game_id = self.conn.execute('INSERT INTO games (start_fen) VALUES (?)', (start_fen,)).lastrowid
+            self.conn.commit()
+        return game_id
+
+    def record_move(self, game_id, ply, uci, san, fen, zobrist, clock_ms=None):
+        fen = position_fen(fen)
+        self.write(('INSERT OR IGNORE INTO positions (fen) VALUES (?)', (fen,)),
+                   ('''INSERT OR REPLACE INTO moves (game_id, ply, uci, san, zobrist, clock_ms, position_id)
+                       VALUES (?, ?, ?, ?, ?, ?, (SELECT id FROM positions WHERE fen = ?))''',
+                    (game_id, ply, uci, san, to_signed(zobrist), clock_ms, fen)))
+
+    def finish_game(self, game_id, result):
+        self.write(('UPDATE games SET result = ? WHERE id = ?', (result, game_id)))
+
+    def delete_moves_from(self, game_id, ply):
+        # Undo: forget the move at ply and every later one
+        self.write(('DELETE FROM moves WHERE game_id = ? AND ply >= ?', (game_id, ply)))
+
+    def game_moves(self, game_id):
+        # (ply, uci, san, fen, clock_ms) of every move of a game, for replay; the FENs come
+        # without move counters
+        self.flush()
+        with self.lock:
+            return self.conn.execute('''SELECT m.ply, m.uci, m.san, p.fen, m.clock_ms FROM moves m
+                                        JOIN positions p ON p.id = m.position_id
+                                        WHERE m.game_id = ? ORDER BY m.ply''', (game_id,)).fetchall()
+
+    def games_with_position(self, zobrist):
+        # Ids of the games that reached the position with this Zobrist key
+        self.flush()
+        with self.lock:
+            rows = self.conn.execute('SELECT DISTINCT game_id FROM moves WHERE zobrist = ? ORDER BY game_id',
+                                     (to_signed(zobrist),)).fetchall()
+        return [game_id for (game_id,) in rows]
 
     def clear_database(self):
-        cursor = self.conn.cursor()
-        cursor.execute('DELETE FROM fen_strings')  # This will delete all rows in the table
-        self.conn.commit()
-    def delete_fen_string(self, fen_string):
-        cursor = self.conn.cursor()
-        cursor.execute('DELETE FROM fen_strings WHERE fen_string = ?', (fen_string,))
-        self.conn.commit()
-    def insert_fen_string(self, fen_string):
-        cursor = self.conn.cursor()
-        cursor.execute('INSERT INTO fen_strings (fen_string) VALUES (?)', (fen_string,))
-        self.conn.commit()
+        self.flush()
+        with self.lock:
+            self.conn.execute('DELETE FROM moves')
+            self.conn.execute('DELETE FROM games')
+            self.conn.execute('DELETE FROM positions')
+            self.conn.commit()
 
     def close(self):
-        self.conn.close()
\ No newline at end of file
+        if self.writer.is_alive():
+            self.pending.put(None)
+            self.writer.join()
+        self.conn.close()
@@ -0,0 +1,89 @@
+# Fixed-size transposition table for the search, keyed by Position.zobrist.
+# Entries live in two flat 64-bit arrays, so memory use is set once by the size in MB.
+# The arrays can also be laid over a shared buffer (multiprocessing.shared_memory), so
+# several search processes fill and read one table.
+from array import array
+
+from position import Move
+
+EXACT = 0
+LOWER_BOUND = 1  # Search failed high, the real score is at least the stored one
+UPPER_BOUND = 2  # Search failed low, the real score is at most the stored one
+
+SLOT_BYTES = 16  # One 8-byte key plus one 8-byte packed entry
+SCORE_OFFSET = 1 << 23
+
+# Packed entry layout: move (16 bits) | score + offset (24) | depth (8) | bound (2) | age (6)
+# Slots keep key ^ entry instead of the key, so an entry torn by two processes writing the
+# same slot at once no longer matches its key and is simply a miss.
+
+
+def table_bytes(size_mb):
+    # Bytes a table of this size needs, e.g. to allocate the shared buffer for it
+    return max(1, int(size_mb * 1024 * 1024) // (2 * SLOT_BYTES)) * 2 * SLOT_BYTES
+
+
+class TranspositionTable:
+    def __init__(self, size_mb=16, buffer=None):
+        self.buffer = buffer
+        self.resize(size_mb)
+
+    def resize(self, size_mb):
+        self.size_mb = size_mb
+        # Every bucket holds a depth-preferred slot followed by an always-replace slot
+        self.buckets = table_bytes(size_mb) // (2 * SLOT_BYTES)
+        slots = 2 * self.buckets
+        if self.buffer is None:
+            self.keys = array('Q', bytes(8 * slots))
+            self.data = array('Q', bytes(8 * slots))
+        else:
+            view = memoryview(self.buffer)[:table_bytes(size_mb)].cast('Q')
+            self.keys = view[:slots]
+            self.data = view[slots:]
+        self.age = 0
+
+    def clear(self):
+        if self.buffer is None:
+            self.resize(self.size_mb)
+        else:
+            size = table_bytes(self.size_mb)
+            self.buffer[:size] = bytes(size)
+            self.age = 0
+
+    def new_search(self):
+        # Entries from earlier searches lose their claim on the depth-preferred slots
+        self.age = (self.age + 1) & 63
+
+    def probe(self, key):
+        # Returns (depth, score, bound, move) or None; move is None when no best move was stored
+        slot = (key % self.buckets) * 2
+        keys = self.keys
+        data = self.data
+        packed = data[slot]
+        if keys[slot] ^ packed != key or not packed:
+            slot += 1
+            packed = data[slot]
+            if keys[slot] ^ packed != key or not packed:
+                return None
+        move = packed & 0xFFFF
+        return ((packed >> 40) & 0xFF, ((packed >> 16) & 0xFFFFFF) - SCORE_OFFSET,
+                (packed >> 48) & 3, Move.unpack(move) if move else None)
+
+    def store(self, key, depth, score, bound, move=None):
+        slot = (key % self.buckets) * 2
+        packed = ((move.pack() if move is not None else 0) | (score + SCORE_OFFSET) << 16 |
+                  depth << 40 | bound << 48 | self.age << 50)
+        stored = self.data[slot]
+        if (self.keys[slot] ^ stored == key or not stored or depth >= (stored >> 40) & 0xFF
+                or stored >> 50 != self.age):
+            self.keys[slot] = key ^ packed
+            self.data[slot] = packed
+        else:
+            self.keys[slot + 1] = key ^ packed
+            self.data[slot + 1] = packed
+
+    def hashfull(self):
+        # Permille of the first thousand slots written during the current search
+        sample = min(1000, len(self.data))
+        used = sum(1 for packed in self.data[:sample] if packed and packed >> 50 == self.age)
+        return used * 1000 // sample
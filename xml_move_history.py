@@ -1,33 +1,72 @@
-import xml.etree.ElementTree as ET
-from xml.dom import minidom
 import os
+import xml.etree.ElementTree as ET
+from xml.sax.saxutils import escape
+
+OPEN_TAG = b'<FENNotations>\n'
+CLOSE_TAG = b'</FENNotations>\n'
+MOVE_END = b'</Move>\n'
+TAIL_BYTES = 4096  # Far more than one <Move> element
 
-class FenXMLDatabase:
+
+class FenXMLWriter:
+    # Append-only log of the game's FEN strings. The file stays open and every move is written
+    # as one <Move> element after the previous one. flush() writes the closing tag and steps back
+    # over it, so the next move overwrites it and a move costs the same however long the game is.
     def __init__(self, file_name='fen_notations.xml'):
         self.file_name = file_name
-        if not os.path.exists(self.file_name):
-            self.create_file()
-        else:
-            self.tree = ET.parse(self.file_name)
-            self.root = self.tree.getroot()
-
-    def create_file(self):
-        self.root = ET.Element("FENNotations")
-        self.tree = ET.ElementTree(self.root)
-        self.tree.write(self.file_name)
+        self.file = open(file_name, 'r+b' if os.path.exists(file_name) else 'w+b')
+        self.resume()
 
-    def prettify(self, elem):
-        """Return a pretty-printed XML string for the Element."""
-        rough_string = ET.tostring(elem, 'utf-8')
-        reparsed = minidom.parseString(rough_string)
-        return reparsed.toprettyxml(indent="  ")
+    def resume(self):
+        # Continue after the last <Move> of an existing log; anything else starts a new one
+        size = self.file.seek(0, os.SEEK_END)
+        self.file.seek(0)
+        if self.file.read(len(OPEN_TAG)) != OPEN_TAG:
+            self.clear_file()
+            return
+        tail_start = max(len(OPEN_TAG), size - TAIL_BYTES)
+        self.file.seek(tail_start)
+        tail = self.file.read()
+        if tail.endswith(CLOSE_TAG):
+            self.file.seek(size - len(CLOSE_TAG))
+        else:
+            # Cut short before a flush: drop any half-written element after the last full <Move>
+            self.file.seek(tail_start + tail.rfind(MOVE_END) + len(MOVE_END) if MOVE_END in tail
+                           else len(OPEN_TAG))
 
     def add_fen_notation(self, fen_string):
-        move = ET.SubElement(self.root, "Move")
-        fen = ET.SubElement(move, "FEN")
-        fen.text = fen_string
-        self.tree.write(self.file_name)
+        self.file.write(f'<Move><FEN>{escape(fen_string)}</FEN>'.encode('utf-8') + MOVE_END)
+
+    def flush(self):
+        end = self.file.tell()
+        self.file.write(CLOSE_TAG)
+        self.file.truncate()
+        self.file.flush()
+        self.file.seek(end)
 
     def clear_file(self):
-        self.root.clear()
-        self.tree.write(self.file_name)
+        self.file.seek(0)
+        self.file.truncate()
+        self.file.write(OPEN_TAG)
+        self.flush()
+
+    def close(self):
+        if not self.file.closed:
+            self.flush()
+            self.file.close()
+
+
+def iter_fen_notations(file_name='fen_notations.xml'):
+    # Yields the logged FEN strings in order. Each <Move> is dropped from the tree once read,
+    # so replaying a huge history takes constant memory. A log cut short by a crash ends at
+    # its last complete move.
+    root = None
+    try:
+        for event, elem in ET.iterparse(file_name, events=('start', 'end')):
+            if root is None:
+                root = elem
+            elif event == 'end' and elem.tag == 'Move':
+                yield elem.findtext('FEN')
+                root.clear()
+    except ET.ParseError:
+        return
@@ -0,0 +1,28 @@
+# 64-bit Zobrist keys. The generator is seeded, so a key means the same position in every
+# run and can be stored or sent over the network.
+import random
+
+from bitboards import WHITE, BLACK, PAWN, PAWN_ATTACKS, iter_squares
+
+_random = random.Random(0x5EED_C4E55)
+
+# PIECE_KEYS[color][piece_type][square]
+PIECE_KEYS = [[[_random.getrandbits(64) for sq in range(64)] for piece_type in range(6)] for color in (WHITE, BLACK)]
+BLACK_TO_MOVE_KEY = _random.getrandbits(64)
+CASTLING_KEYS = [0] + [_random.getrandbits(64) for flags in range(1, 16)]  # One key per castling-rights mask
+EP_FILE_KEYS = [_random.getrandbits(64) for file in range(8)]
+
+
+def zobrist_hash(pos):
+    # Full recomputation; Position keeps the same value up to date incrementally
+    key = 0
+    for color in (WHITE, BLACK):
+        for piece_type, bb in enumerate(pos.pieces[color]):
+            for sq in iter_squares(bb):
+                key ^= PIECE_KEYS[color][piece_type][sq]
+    if pos.turn == BLACK:
+        key ^= BLACK_TO_MOVE_KEY
+    key ^= CASTLING_KEYS[pos.castling]
+    if pos.ep_square is not None and PAWN_ATTACKS[pos.turn ^ 1][pos.ep_square] & pos.pieces[pos.turn][PAWN]:
+        key ^= EP_FILE_KEYS[pos.ep_square & 7]  # Only when a pawn can take en passant
+    return key